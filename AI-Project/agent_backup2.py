@@ -1,5 +1,5 @@
-from agent_utils import get_all_valid_moves
-import copy
+from agent_utils import get_distinct_moves
+from search import NegamaxSearch
 import time
 from typing import List, Optional, Tuple
 
@@ -15,21 +15,6 @@ SCORE_3 = 50
 SCORE_4 = 1000
 WIN_SCORE = 10000
 
-class TimeoutException(Exception):
-    pass
-
-def apply_move(board: List[List[Optional[str]]], move: Tuple[int, int, int, int], player_symbol: str) -> None:
-    sr, sc, tr, tc = move
-    if sr == tr:  # Horizontal move
-        direction = 1 if tc > sc else -1
-        for col in range(sc, tc, direction):
-            board[sr][col] = board[sr][col + direction]
-    else:  # Vertical move
-        direction = 1 if tr > sr else -1
-        for row in range(sr, tr, direction):
-            board[row][sc] = board[row + direction][sc]
-    board[tr][tc] = player_symbol
-
 def check_winner(board: List[List[Optional[str]]], player_symbol: str) -> bool:
     size = len(board)
     for i in range(size):
@@ -68,38 +53,9 @@ def evaluate_board(board: List[List[Optional[str]]], player_symbol: str) -> int:
     score += evaluate_line([board[i][size-1-i] for i in range(size)], player_symbol, opponent, size)
     return score
 
-def minimax(board, depth, is_max, player_symbol, alpha, beta, start_time, current_depth):
-    if time.time() - start_time > TIME_LIMIT:
-        raise TimeoutException()
-
-    opponent = 'O' if player_symbol == 'X' else 'X'
-    if depth == 0 or check_winner(board, player_symbol) or check_winner(board, opponent):
-        return evaluate_board(board, player_symbol) * (DEPTH_DISCOUNT ** current_depth)
-
-    moves = get_all_valid_moves(board, player_symbol if is_max else opponent)
-    best_val = float('-inf') if is_max else float('inf')
-
-    for move in moves:
-        new_board = copy.deepcopy(board)
-        apply_move(new_board, move, player_symbol if is_max else opponent)
-        val = minimax(new_board, depth-1, not is_max, player_symbol, alpha, beta, start_time, current_depth+1)
-        if is_max:
-            best_val = max(best_val, val)
-            alpha = max(alpha, val)
-        else:
-            best_val = min(best_val, val)
-            beta = min(beta, val)
-        if beta <= alpha:
-            break
-        if time.time() - start_time > TIME_LIMIT:
-            raise TimeoutException()
-    return best_val
-
 def agent_move(board: List[List[Optional[str]]], player_symbol: str) -> Tuple[int, int, int, int]:
-    start_time = time.time()
-    best_move = None
-    best_score = float('-inf')
-    valid_moves = get_all_valid_moves(board, player_symbol)
+    start_time = time.monotonic()
+    valid_moves = get_distinct_moves(board, player_symbol)
     size = len(board)
     if not valid_moves:
         return (0, 0, 0, 0)
@@ -117,32 +73,7 @@ def agent_move(board: List[List[Optional[str]]], player_symbol: str) -> Tuple[in
         MAX_DEPTH = min(MAX_DEPTH, 5)
         TIME_LIMIT = 2.0
 
-    try:
-        candidate_moves = valid_moves
-        for depth in range(1, MAX_DEPTH + 1):
-            scored_moves = []
-            current_best_move = None
-            current_best_score = float('-inf')
-            for move in candidate_moves:
-                if time.time() - start_time > TIME_LIMIT:
-                    raise TimeoutException()
-                new_board = copy.deepcopy(board)
-                apply_move(new_board, move, player_symbol)
-                if depth == 1:
-                    score = evaluate_board(new_board, player_symbol)
-                else:
-                    score = minimax(new_board, depth-1, False, player_symbol,
-                                    float('-inf'), float('inf'), start_time, 1)
-                scored_moves.append((score, move))
-                if score > current_best_score:
-                    current_best_score = score
-                    current_best_move = move
-            if current_best_move is not None:
-                best_move = current_best_move
-                best_score = current_best_score
-            # Beam search: keep top BEAM_WIDTH moves
-            scored_moves.sort(reverse=True, key=lambda x: x[0])
-            candidate_moves = [m for (_, m) in scored_moves[:BEAM_WIDTH]]
-    except TimeoutException:
-        pass
+    search = NegamaxSearch(evaluate_board, max_depth=MAX_DEPTH, time_limit=TIME_LIMIT,
+                           depth_discount=DEPTH_DISCOUNT, root_beam_width=BEAM_WIDTH)
+    best_move = search.search(board, player_symbol, start_time, root_moves=valid_moves)
     return best_move if best_move else valid_moves[0]
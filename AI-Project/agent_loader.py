@@ -1,7 +1,22 @@
 import importlib.util
 import sys
 import os
-from typing import Callable
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from packed_board import PackedBoard
+
+# Agents that set this module-level flag to True receive a PackedBoard instead of a list of lists.
+PACKED_BOARD_FLAG = "USE_PACKED_BOARD"
+# Agents that set this flag to True are called with time_budget=<seconds the harness allows per move>.
+TIME_BUDGET_FLAG = "ACCEPTS_TIME_BUDGET"
+# Agents that set this flag to True are called with position_history=<{position_hash: times seen}>
+# for the game so far (XOShiftGame.position_counts), so they can avoid or aim for repetitions.
+HISTORY_FLAG = "ACCEPTS_POSITION_HISTORY"
+# Optional function agents may define to think on the opponent's time:
+#   agent_ponder(board_after_own_move, player_symbol, should_stop) -> None
+# Agents with ACCEPTS_POSITION_HISTORY also get position_history=<...> (including
+# the position after their own move) so they can predict the next history.
+PONDER_FUNCTION = "agent_ponder"
 
     #modified code to solve loading issue
 def load_agent(agent_path: str) -> Callable:
@@ -27,6 +42,75 @@ def load_agent(agent_path: str) -> Callable:
     return getattr(agent_module, 'agent_move')
 
 
+def _agent_flag(agent_fn: Callable, flag: str) -> bool:
+    agent_module = sys.modules.get(getattr(agent_fn, '__module__', ''))
+    return bool(getattr(agent_module, flag, False))
+
+
+def agent_uses_packed_board(agent_fn: Callable) -> bool:
+    """
+    True if the module defining `agent_fn` opted in via USE_PACKED_BOARD = True.
+    """
+    return _agent_flag(agent_fn, PACKED_BOARD_FLAG)
+
+
+def agent_accepts_time_budget(agent_fn: Callable) -> bool:
+    """
+    True if the module defining `agent_fn` opted in via ACCEPTS_TIME_BUDGET = True.
+    """
+    return _agent_flag(agent_fn, TIME_BUDGET_FLAG)
+
+
+def agent_accepts_position_history(agent_fn: Callable) -> bool:
+    """
+    True if the module defining `agent_fn` opted in via ACCEPTS_POSITION_HISTORY = True.
+    """
+    return _agent_flag(agent_fn, HISTORY_FLAG)
+
+
+def get_agent_ponder(agent_fn: Callable) -> Optional[Callable]:
+    """
+    Returns the agent_ponder function of the module defining `agent_fn`, if it has one.
+    """
+    agent_module = sys.modules.get(getattr(agent_fn, '__module__', ''))
+    ponder_fn = getattr(agent_module, PONDER_FUNCTION, None)
+    return ponder_fn if callable(ponder_fn) else None
+
+
+def prepare_agent_board(agent_fn: Callable,
+                        board: List[List[Optional[str]]]) -> Union[List[List[Optional[str]]], PackedBoard]:
+    """
+    Returns a private copy of `board` in the format the agent asked for.
+    Legacy agents keep getting a list of lists.
+    """
+    if agent_uses_packed_board(agent_fn):
+        return PackedBoard.from_lists(board)
+    return [[cell for cell in row] for row in board]
+
+
+def prepare_agent_kwargs(agent_fn: Callable, time_budget: float,
+                         position_history: Optional[Dict[int, int]] = None) -> Dict[str, Any]:
+    """
+    Returns the optional keyword arguments the agent opted in to.
+    Legacy agents are still called as agent_move(board, player_symbol).
+    """
+    kwargs: Dict[str, Any] = {}
+    if agent_accepts_time_budget(agent_fn):
+        kwargs["time_budget"] = time_budget
+    if position_history is not None and agent_accepts_position_history(agent_fn):
+        kwargs["position_history"] = position_history
+    return kwargs
+
+
+def prepare_ponder_kwargs(agent_fn: Callable, position_history: Optional[Dict[int, int]] = None) -> Dict[str, Any]:
+    """
+    Returns the optional keyword arguments for agent_ponder; like prepare_agent_kwargs, minus the time budget.
+    """
+    if position_history is not None and agent_accepts_position_history(agent_fn):
+        return {"position_history": position_history}
+    return {}
+
+
     #original code
 # def load_agent(agent_path: str) -> Callable:
 #     """
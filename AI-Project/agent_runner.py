@@ -0,0 +1,306 @@
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent_loader import (get_agent_ponder, load_agent, prepare_agent_board, prepare_agent_kwargs,
+                          prepare_ponder_kwargs)
+
+Board = List[List[Optional[str]]]
+Move = Tuple[int, int, int, int]
+
+# How long a stopped or overrunning worker gets to exit before it is killed
+SHUTDOWN_TIMEOUT = 0.5
+# How long a new worker may take to import its agent before start() gives up
+STARTUP_TIMEOUT = 30.0
+# Pondering agents and the harness each want a core; with fewer, pondering
+# slows down the agent whose clock is running
+PONDER_MIN_CPUS = 3
+
+
+class MoveResult:
+    """
+    Outcome of one agent call.
+
+    elapsed is the harness's wall time from sending the board to receiving the
+    answer; think_time is the time spent inside agent_move as measured by the
+    worker, so elapsed - think_time is the per-move harness overhead.
+    ponder_time is how long the agent pondered on the opponent's time before
+    this move; it is reported, never charged to either clock.
+    """
+    __slots__ = ('move', 'exception', 'timed_out', 'elapsed', 'think_time', 'ponder_time')
+
+    def __init__(self, move: Optional[Move] = None, exception: Optional[BaseException] = None,
+                 timed_out: bool = False, elapsed: float = 0.0, think_time: float = 0.0,
+                 ponder_time: float = 0.0):
+        self.move = move
+        self.exception = exception
+        self.timed_out = timed_out
+        self.elapsed = elapsed
+        self.think_time = think_time
+        self.ponder_time = ponder_time
+
+
+def ponder_is_fair() -> bool:
+    """
+    True if this machine has enough cores for both agents to ponder without
+    taking CPU from the agent that is on the clock.
+    """
+    return (os.cpu_count() or 1) >= PONDER_MIN_CPUS
+
+
+def _worker_main(agent_path: str, conn: Connection) -> None:
+    """
+    Body of a worker process: loads the agent once, then serves requests until
+    it receives None:
+      ("move", board, player_symbol, time_budget, position_history): replies
+          (move, exception, think_time, ponder_time).
+      ("ponder", board, player_symbol, position_history): no reply; runs
+          agent_ponder until the next request arrives.
+    """
+    try:
+        agent_fn = load_agent(agent_path)
+    except Exception as e:
+        conn.send(("error", e))
+        return
+    ponder_fn = get_agent_ponder(agent_fn)
+    conn.send(("ready", ponder_fn is not None))
+
+    ponder_time = 0.0
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        start = time.monotonic()
+        if request[0] == "ponder":
+            _, board, player_symbol, position_history = request
+            try:
+                # conn.poll() without a timeout tells the agent the harness wants it back
+                ponder_fn(prepare_agent_board(agent_fn, board), player_symbol, conn.poll,
+                          **prepare_ponder_kwargs(agent_fn, position_history))
+            except Exception:
+                pass  # pondering is best effort; the next move request still gets a normal answer
+            ponder_time += time.monotonic() - start
+            continue
+
+        _, board, player_symbol, time_budget, position_history = request
+        try:
+            move = agent_fn(prepare_agent_board(agent_fn, board), player_symbol,
+                            **prepare_agent_kwargs(agent_fn, time_budget, position_history))
+            reply: Tuple[Any, ...] = (move, None, time.monotonic() - start, ponder_time)
+        except Exception as e:
+            reply = (None, e, time.monotonic() - start, ponder_time)
+        ponder_time = 0.0
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # e.g. an exception or move that cannot be pickled
+            conn.send((None, RuntimeError(f"Agent reply could not be sent: {e}"), reply[2], reply[3]))
+
+
+class AgentWorker:
+    """
+    A long-lived process running one agent for one game.
+
+    The agent module is imported once, and its module-level state (search
+    tables, caches) survives from one move to the next. Each request_move
+    call sends the board over a pipe and waits at most time_limit seconds. A
+    worker that overruns, crashes or breaks the pipe is killed and a
+    replacement is spawned at once. The replacement loads while the opponent
+    thinks, and the clock for the next move only starts once it is ready.
+
+    With ponder=True, and if the agent defines agent_ponder, ponder() lets the
+    worker think while the opponent is on the clock. The move request that
+    ends pondering is timed from when it is sent, so the time the agent takes
+    to stop pondering counts against its own move.
+    """
+
+    def __init__(self, agent_path: str, time_limit: float, ponder: bool = False):
+        self.agent_path = agent_path
+        self.time_limit = time_limit
+        self.ponder_enabled = ponder
+        self.name = os.path.basename(agent_path).replace(".py", "")
+        self.replacements = 0
+        self.supports_ponder = False
+        self._process: Optional[multiprocessing.Process] = None
+        self._conn: Optional[Connection] = None
+        self._ready = False
+
+    @property
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    def start(self) -> None:
+        """
+        Starts the worker and waits until its agent is loaded.
+
+        Raises whatever load_agent raised in the worker, or TimeoutError.
+        """
+        if not self.is_alive:
+            self._spawn()
+        if self._ready:
+            return
+        parent_conn = self._conn
+        if not parent_conn.poll(STARTUP_TIMEOUT):
+            self.close()
+            raise TimeoutError(f"Agent '{self.name}' did not start within {STARTUP_TIMEOUT}s")
+        try:
+            status, detail = parent_conn.recv()
+        except EOFError:
+            status, detail = "error", RuntimeError(f"Agent '{self.name}' exited while loading")
+        if status != "ready":
+            self.close()
+            raise detail
+        self.supports_ponder = detail
+        self._ready = True
+
+    def _spawn(self) -> None:
+        parent_conn, child_conn = multiprocessing.Pipe()
+        # Not a daemon, so agents may start helper processes of their own (see parallel_search)
+        process = multiprocessing.Process(target=_worker_main, args=(self.agent_path, child_conn))
+        process.start()
+        child_conn.close()
+        self._process, self._conn, self._ready = process, parent_conn, False
+
+    def _replace(self) -> None:
+        self._kill()
+        self.replacements += 1
+        self._spawn()
+
+    def request_move(self, board: Board, player_symbol: str,
+                     position_history: Optional[Dict[int, int]] = None) -> MoveResult:
+        """
+        Asks the agent for a move on a private copy of `board`, within time_limit.
+        position_history (XOShiftGame.position_counts) is passed on to agents
+        that opted in to it.
+        """
+        self.start()
+        conn = self._conn
+
+        start = time.monotonic()
+        try:
+            conn.send(("move", [row[:] for row in board], player_symbol, self.time_limit, position_history))
+            if not conn.poll(self.time_limit):
+                self._replace()
+                return MoveResult(timed_out=True, elapsed=time.monotonic() - start)
+            move, exception, think_time, ponder_time = conn.recv()
+        except (EOFError, OSError) as e:
+            self._replace()
+            return MoveResult(exception=RuntimeError(f"Agent '{self.name}' worker died: {e!r}"),
+                              elapsed=time.monotonic() - start)
+        return MoveResult(move, exception, False, time.monotonic() - start, think_time, ponder_time)
+
+    def ponder(self, board: Board, player_symbol: str,
+               position_history: Optional[Dict[int, int]] = None) -> None:
+        """
+        Lets the agent think about `board` (the position after its own move,
+        opponent to play) until its next request_move. position_history
+        should already count that position. Does nothing unless pondering is
+        enabled and the agent supports it.
+        """
+        if not (self.ponder_enabled and self.supports_ponder and self._ready and self.is_alive):
+            return
+        try:
+            self._conn.send(("ponder", [row[:] for row in board], player_symbol, position_history))
+        except (OSError, ValueError):
+            self._replace()
+
+    def close(self) -> None:
+        """
+        Asks the worker to exit and reaps it, killing it if it does not stop in time.
+        """
+        if self._conn is not None and self.is_alive:
+            try:
+                self._conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self._kill(graceful=True)
+
+    def _kill(self, graceful: bool = False) -> None:
+        process = self._process
+        if process is not None:
+            if graceful:
+                process.join(timeout=SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        if self._conn is not None:
+            self._conn.close()
+        self._process, self._conn, self._ready = None, None, False
+
+
+def _fresh_process_move(agent_fn, board: Board, player_symbol: str, time_limit: float):
+    """
+    The per-move sandbox main.py used before AgentWorker: one Process and Queue per call.
+    """
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_fresh_process_wrapper,
+                                      args=(agent_fn, prepare_agent_board(agent_fn, board), player_symbol,
+                                            result_queue, prepare_agent_kwargs(agent_fn, time_limit)))
+    process.start()
+    try:
+        return result_queue.get(timeout=time_limit)
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join(timeout=SHUTDOWN_TIMEOUT)
+
+
+def _fresh_process_wrapper(agent_fn, board, player_symbol, result_queue, agent_kwargs):
+    try:
+        result_queue.put(agent_fn(board, player_symbol, **agent_kwargs))
+    except Exception as e:
+        result_queue.put(e)
+
+
+def measure_overhead(agent_path: str, size: int = 5, moves: int = 30, time_limit: float = 2.0,
+                     seed: int = 0) -> None:
+    """
+    Compares the harness overhead per move of a fresh Process per call with a
+    persistent AgentWorker, using positions from a random game. Use a fast
+    agent (e.g. random_agent.py) so the agent's own time does not dominate.
+    """
+    from game import XOShiftGame
+    from agent_utils import get_all_valid_moves
+
+    rng = random.Random(seed)
+    positions = []
+    game = XOShiftGame(size)
+    while len(positions) < moves:
+        symbol = game.current_player
+        positions.append(([row[:] for row in game.board], symbol))
+        game.apply_move(*rng.choice(get_all_valid_moves(game.board, symbol)), symbol)
+        if game.winner:
+            game.reset()
+        else:
+            game.switch_player()
+
+    agent_fn = load_agent(agent_path)
+    start = time.monotonic()
+    for board, symbol in positions:
+        _fresh_process_move(agent_fn, board, symbol, time_limit)
+    fresh = (time.monotonic() - start) / moves
+
+    worker = AgentWorker(agent_path, time_limit)
+    worker.start()
+    results = [worker.request_move(board, symbol) for board, symbol in positions]
+    worker.close()
+    persistent = sum(r.elapsed for r in results) / moves
+    think = sum(r.think_time for r in results) / moves
+
+    print(f"{worker.name} ({multiprocessing.get_start_method()}): fresh process {fresh * 1000:.1f} ms/move, "
+          f"persistent worker {persistent * 1000:.1f} ms/move (agent itself {think * 1000:.1f} ms)")
+    print(f"Overhead saved per move: {(fresh - persistent) * 1000:.1f} ms "
+          f"({(fresh - persistent) / time_limit:.1%} of a {time_limit:.1f}s budget returned to the agent)")
+
+
+if __name__ == "__main__":
+    measure_overhead(os.path.join(os.path.dirname(os.path.abspath(__file__)), "random_agent.py"))
@@ -1,6 +1,14 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+
+from bitboard import apply_move_masks, get_tables, pack_board, unpack_board
+from board_tables import (get_line_coords, get_move_spans, get_rim_cells, get_source_targets, get_touched_lines,
+                          get_zobrist_keys)
 
 EMPTY_CELL = None
+PLAYERS = ['X', 'O']
+
+# size -> {selectable-source bitmask over the rim cells -> legal moves}, filled lazily
+_MOVE_TABLES: Dict[int, Dict[int, Tuple[Tuple[int, int, int, int], ...]]] = {}
 
 
 def get_possible_selections(board: List[List[Optional[str]]], player_symbol: str) -> List[Tuple[int, int]]:
@@ -14,17 +22,10 @@ def get_possible_selections(board: List[List[Optional[str]]], player_symbol: str
     Returns:
         A list of (row, col) tuples representing valid cells to select.
     """
-    size = len(board)
-    rim_cells_coords = []
-    for r_idx in range(size):
-        for c_idx in range(size):
-            if r_idx == 0 or r_idx == size - 1 or c_idx == 0 or c_idx == size - 1:
-                rim_cells_coords.append((r_idx, c_idx))
-
     empty_rim_selections = []
     player_rim_selections = []
 
-    for r, c in rim_cells_coords:
+    for r, c in get_rim_cells(len(board)):
         if board[r][c] == EMPTY_CELL:
             empty_rim_selections.append((r, c))
         elif board[r][c] == player_symbol:
@@ -75,3 +76,153 @@ def get_all_valid_moves(board: List[List[Optional[str]]], player_symbol: str) ->
             all_genuinely_valid_moves.append((sr, sc, tr_final, tc_final))
 
     return all_genuinely_valid_moves
+
+
+def lookup_valid_moves(board: List[List[Optional[str]]], player_symbol: str) -> Tuple[Tuple[int, int, int, int], ...]:
+    """
+    Table-driven version of get_all_valid_moves, which stays the reference implementation.
+
+    The legal moves only depend on which rim cells may be selected, so the rim
+    occupancy is reduced to a bitmask of selectable sources (the empty rim cells,
+    or the player's own rim cells when none are empty). That key indexes a
+    per-size table that is filled lazily, one pattern at a time.
+
+    Args:
+        board: The current game board state.
+        player_symbol: The symbol of the player making the move.
+
+    Returns:
+        The same moves, in the same order, as get_all_valid_moves. The tuple is
+        shared between calls and must not be modified.
+    """
+    size = len(board)
+    rim_cells = get_rim_cells(size)
+    empty_key = 0
+    player_key = 0
+    bit = 1
+    for r, c in rim_cells:
+        cell = board[r][c]
+        if cell == EMPTY_CELL:
+            empty_key |= bit
+        elif cell == player_symbol:
+            player_key |= bit
+        bit <<= 1
+    key = empty_key or player_key
+
+    table = _MOVE_TABLES.setdefault(size, {})
+    moves = table.get(key)
+    if moves is None:
+        source_targets = get_source_targets(size)
+        moves = tuple(
+            (sr, sc, tr, tc)
+            for i, (sr, sc) in enumerate(rim_cells) if key >> i & 1
+            for tr, tc in source_targets[(sr, sc)]
+        )
+        table[key] = moves
+    return moves
+
+
+def get_distinct_moves(board: List[List[Optional[str]]], player_symbol: str, with_boards: bool = False
+                       ) -> Union[List[Tuple[int, int, int, int]],
+                                  List[Tuple[Tuple[int, int, int, int], List[List[Optional[str]]]]]]:
+    """
+    Generates one representative move per distinct child position.
+
+    Different moves often produce the same board, e.g. pushing a line that
+    already holds only the player's pieces, or a corner reaching the same
+    result through both of its targets. Children are compared as bitboards and
+    the first move (in get_all_valid_moves order) producing each one is kept,
+    so a search over these moves finds the same best move with fewer nodes.
+
+    Args:
+        board: The current game board state.
+        player_symbol: The symbol of the player making the move.
+        with_boards: If True, also return each child board.
+
+    Returns:
+        A list of moves, or of (move, child_board) pairs if with_boards is set.
+    """
+    tables = get_tables(len(board))
+    player_index = PLAYERS.index(player_symbol)
+    x_mask, o_mask = pack_board(board)
+    seen = set()
+    distinct = []
+    for move in lookup_valid_moves(board, player_symbol):
+        child = apply_move_masks(x_mask, o_mask, move, player_index, tables)
+        if child in seen:
+            continue
+        seen.add(child)
+        distinct.append((move, unpack_board(child[0], child[1], tables.size)) if with_boards else move)
+    return distinct
+
+
+def get_winner_after_move(board: List[List[Optional[str]]], move: Tuple[int, int, int, int]) -> Optional[str]:
+    """
+    Finds the winner after `move` was applied to a board that had no complete line before it.
+
+    Only the lines through the cells the move shifted are re-examined, and a
+    simultaneous X/O line is resolved in PLAYERS order like XOShiftGame.check_winner.
+
+    Args:
+        board: The board state right after the move.
+        move: The (src_r, src_c, tgt_r, tgt_c) move that produced it.
+
+    Returns:
+        The winning symbol, or None if nobody has a complete line.
+    """
+    size = len(board)
+    lines = get_line_coords(size)
+    touched = get_touched_lines(size)[move]
+    for symbol in PLAYERS:
+        for line_idx in touched:
+            if all(board[r][c] == symbol for r, c in lines[line_idx]):
+                return symbol
+    return None
+
+
+def zobrist_hash(board: List[List[Optional[str]]], player_to_move: str) -> int:
+    """
+    Computes the 64-bit Zobrist key of a position from scratch.
+
+    Uses the same keys as XOShiftGame.position_hash, so hashes computed by an
+    agent match the ones the game maintains incrementally.
+
+    Args:
+        board: The board state.
+        player_to_move: The symbol of the player whose turn it is.
+
+    Returns:
+        The position key, including the side to move.
+    """
+    cell_keys, side_key = get_zobrist_keys(len(board))
+    h = side_key if player_to_move == PLAYERS[1] else 0
+    for r, row in enumerate(board):
+        keys_row = cell_keys[r]
+        for c, cell in enumerate(row):
+            h ^= keys_row[c][cell]
+    return h
+
+
+def update_zobrist_hash(position_hash: int, board_before: List[List[Optional[str]]],
+                        board_after: List[List[Optional[str]]], move: Tuple[int, int, int, int]) -> int:
+    """
+    Derives the child's Zobrist key from the parent's without rehashing the board.
+
+    Only the cells in the move's span changed, so their old keys are XORed out,
+    their new keys XORed in, and the side to move is flipped.
+
+    Args:
+        position_hash: zobrist_hash of board_before with its side to move.
+        board_before: The board before the move.
+        board_after: The board after the move.
+        move: The (src_r, src_c, tgt_r, tgt_c) move that was applied.
+
+    Returns:
+        The key of board_after with the other player to move.
+    """
+    cell_keys, side_key = get_zobrist_keys(len(board_before))
+    h = position_hash ^ side_key
+    for r, c in get_move_spans(len(board_before))[move]:
+        keys = cell_keys[r][c]
+        h ^= keys[board_before[r][c]] ^ keys[board_after[r][c]]
+    return h
@@ -3,6 +3,9 @@ import os
 import time
 import json
 
+# Drives the GUI and needs games started from the menu; for unattended matches
+# use the headless runner instead, e.g. python tournament.py your_agent sample_agent -n 80
+
 # CONFIG
 NUM_BATCHES = 10
 GAMES_PER_BATCH = 8
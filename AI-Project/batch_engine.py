@@ -0,0 +1,231 @@
+import random
+import time
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from board_tables import Move, get_line_coords, get_rim_cells, get_source_targets
+
+# Cell codes used by every array in this module.
+EMPTY_CODE = 0
+X_CODE = 1
+O_CODE = 2
+_CODES = {None: EMPTY_CODE, 'X': X_CODE, 'O': O_CODE}
+_SYMBOLS = (None, 'X', 'O')
+
+
+class BatchTables:
+    """
+    Index arrays for one board size, built once and shared by all batch calls.
+
+    Moves are numbered in agent_utils.get_all_valid_moves order over the whole
+    rim, so column j of a legal-move mask is `moves[j]`.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        cells = size * size
+        rim = get_rim_cells(size)
+        rim_position = {cell: i for i, cell in enumerate(rim)}
+        source_targets = get_source_targets(size)
+
+        self.moves: Tuple[Move, ...] = tuple(
+            (sr, sc, tr, tc) for sr, sc in rim for tr, tc in source_targets[(sr, sc)]
+        )
+        self.rim_indices = np.array([r * size + c for r, c in rim], dtype=np.intp)
+        self.lines = np.array([[r * size + c for r, c in coords] for coords in get_line_coords(size)],
+                              dtype=np.intp)
+        self.move_source_rim = np.array([rim_position[(sr, sc)] for sr, sc, _, _ in self.moves], dtype=np.intp)
+
+        # move_ids[sr, sc, tr, tc] -> move number, or -1 for an illegal pair
+        self.move_ids = np.full((size, size, size, size), -1, dtype=np.intp)
+        # permutations[m] gathers the child of move m out of (flat board ++ mover code)
+        self.permutations = np.tile(np.arange(cells, dtype=np.intp), (len(self.moves), 1))
+        for m, (sr, sc, tr, tc) in enumerate(self.moves):
+            self.move_ids[sr, sc, tr, tc] = m
+            perm = self.permutations[m]
+            if sr == tr:
+                step = 1 if tc > sc else -1
+                for c in range(sc, tc, step):
+                    perm[sr * size + c] = sr * size + c + step
+            else:
+                step = 1 if tr > sr else -1
+                for r in range(sr, tr, step):
+                    perm[r * size + sc] = (r + step) * size + sc
+            perm[tr * size + tc] = cells
+
+
+@lru_cache(maxsize=None)
+def get_batch_tables(size: int) -> BatchTables:
+    if not 3 <= size <= 5:
+        raise ValueError("Board size must be between 3 and 5.")
+    return BatchTables(size)
+
+
+def boards_to_array(boards: List[List[List[Optional[str]]]]) -> np.ndarray:
+    """
+    Packs list-of-lists boards into an (N, size, size) int8 array.
+    """
+    return np.array([[[_CODES[cell] for cell in row] for row in board] for board in boards], dtype=np.int8)
+
+
+def array_to_board(board: np.ndarray) -> List[List[Optional[str]]]:
+    """
+    Converts one (size, size) int8 board back to the list-of-lists format.
+    """
+    return [[_SYMBOLS[code] for code in row] for row in board.tolist()]
+
+
+def apply_moves(boards: np.ndarray, moves: np.ndarray, players: np.ndarray) -> np.ndarray:
+    """
+    Applies one legal move to every board.
+
+    Args:
+        boards: (N, size, size) int8 array of cell codes.
+        moves: (N, 4) integer array of (src_r, src_c, tgt_r, tgt_c).
+        players: (N,) array (or scalar) of mover codes, X_CODE or O_CODE.
+
+    Returns:
+        The (N, size, size) int8 array of child boards.
+    """
+    n_boards, size, _ = boards.shape
+    tables = get_batch_tables(size)
+    moves = np.asarray(moves)
+    # Negative coordinates would wrap around in move_ids and select some other move
+    if ((moves < 0) | (moves >= size)).any():
+        raise ValueError("apply_moves received a move with coordinates outside the board.")
+    move_ids = tables.move_ids[moves[:, 0], moves[:, 1], moves[:, 2], moves[:, 3]]
+    if (move_ids < 0).any():
+        raise ValueError("apply_moves received a move that is not a legal (source, target) pair.")
+
+    movers = np.broadcast_to(np.asarray(players, dtype=np.int8), (n_boards,))
+    extended = np.concatenate([boards.reshape(n_boards, size * size), movers[:, None]], axis=1)
+    children = np.take_along_axis(extended, tables.permutations[move_ids], axis=1)
+    return children.reshape(n_boards, size, size)
+
+
+def find_winners(boards: np.ndarray) -> np.ndarray:
+    """
+    Returns an (N,) int8 vector of winner codes (EMPTY_CODE for none).
+
+    Like XOShiftGame.check_winner, a board with complete lines for both
+    players is won by the first player in PLAYERS order (X).
+    """
+    n_boards, size, _ = boards.shape
+    tables = get_batch_tables(size)
+    line_cells = boards.reshape(n_boards, size * size)[:, tables.lines]
+    x_wins = (line_cells == X_CODE).all(axis=2).any(axis=1)
+    o_wins = (line_cells == O_CODE).all(axis=2).any(axis=1)
+    return np.where(x_wins, X_CODE, np.where(o_wins, O_CODE, EMPTY_CODE)).astype(np.int8)
+
+
+def legal_move_masks(boards: np.ndarray, players: np.ndarray) -> np.ndarray:
+    """
+    Returns an (N, M) boolean array; entry [i, j] says whether
+    get_batch_tables(size).moves[j] is legal for players[i] on boards[i].
+    """
+    n_boards, size, _ = boards.shape
+    tables = get_batch_tables(size)
+    rim_cells = boards.reshape(n_boards, size * size)[:, tables.rim_indices]
+    movers = np.broadcast_to(np.asarray(players, dtype=np.int8), (n_boards,))
+    empty = rim_cells == EMPTY_CODE
+    selectable = np.where(empty.any(axis=1)[:, None], empty, rim_cells == movers[:, None])
+    return selectable[:, tables.move_source_rim]
+
+
+def _random_positions(size: int, count: int, rng: random.Random):
+    """
+    Collects (board, player, move) triples from random games played on XOShiftGame.
+    """
+    from agent_utils import get_all_valid_moves
+    from game import XOShiftGame
+
+    positions = []
+    game = XOShiftGame(size)
+    while len(positions) < count:
+        symbol = game.current_player
+        move = rng.choice(get_all_valid_moves(game.board, symbol))
+        positions.append(([row[:] for row in game.board], symbol, move))
+        game.apply_move(*move, symbol)
+        if game.winner or rng.random() < 0.02:
+            game.reset()
+        else:
+            game.switch_player()
+    return positions
+
+
+def verify_against_reference(count: int = 2000, seed: int = 0) -> None:
+    """
+    Checks children, winners and legal-move masks against game.py / agent_utils.
+    """
+    from agent_utils import get_all_valid_moves
+    from game import XOShiftGame
+
+    rng = random.Random(seed)
+    for size in range(3, 6):
+        tables = get_batch_tables(size)
+        positions = _random_positions(size, count, rng)
+        boards = boards_to_array([board for board, _, _ in positions])
+        players = np.array([_CODES[symbol] for _, symbol, _ in positions], dtype=np.int8)
+        moves = np.array([move for _, _, move in positions])
+
+        children = apply_moves(boards, moves, players)
+        winners = find_winners(children)
+        masks = legal_move_masks(boards, players)
+
+        reference = XOShiftGame(size)
+        for i, (board, symbol, move) in enumerate(positions):
+            reference.load_board(board)
+            assert reference.apply_move(*move, symbol)
+            assert array_to_board(children[i]) == reference.board
+            assert _SYMBOLS[winners[i]] == reference.winner
+            legal = [tables.moves[j] for j in np.flatnonzero(masks[i])]
+            assert legal == get_all_valid_moves(board, symbol)
+
+        for bad_move in ((-1, 0, -1, size - 1), (0, 0, 0, -size), (size, 0, 0, 0)):
+            try:
+                apply_moves(boards[:1], np.array([bad_move]), players[:1])
+            except ValueError:
+                continue
+            raise AssertionError(f"apply_moves accepted the off-board move {bad_move}")
+
+
+def benchmark(count: int = 20000, seed: int = 0) -> None:
+    """
+    Times the batched kernels against looping XOShiftGame.apply_move. Board
+    loading and packing happen before either clock starts, so only the move
+    application, winner check and legal-move masks are timed.
+    """
+    from game import XOShiftGame
+
+    rng = random.Random(seed)
+    for size in range(3, 6):
+        positions = _random_positions(size, count, rng)
+        boards = boards_to_array([board for board, _, _ in positions])
+        players = np.array([_CODES[symbol] for _, symbol, _ in positions], dtype=np.int8)
+        moves = np.array([move for _, _, move in positions])
+
+        games = []
+        for board, symbol, _ in positions:
+            game = XOShiftGame(size)
+            game.load_board(board)
+            games.append(game)
+        start = time.perf_counter()
+        for game, (_, symbol, move) in zip(games, positions):
+            game.apply_move(*move, symbol)
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        find_winners(apply_moves(boards, moves, players))
+        legal_move_masks(boards, players)
+        batch_seconds = time.perf_counter() - start
+
+        print(f"{size}x{size}: {count} positions, loop {loop_seconds * 1000:.1f} ms, "
+              f"batched {batch_seconds * 1000:.1f} ms ({loop_seconds / batch_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    verify_against_reference()
+    print("Batched kernels match XOShiftGame for sizes 3-5.")
+    benchmark()
@@ -0,0 +1,292 @@
+import random
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from board_tables import Move, get_line_coords, get_rim_cells, get_source_targets
+
+Board = List[List[Optional[str]]]
+
+
+class BitboardTables:
+    """
+    Precomputed masks for one board size.
+
+    Cell (r, c) is bit r * size + c. Every legal (src, tgt) pair gets a
+    precomputed shift: the cells strictly between the target and the source
+    (plus the source itself) move one step towards the source, so applying a
+    move is one mask/shift per player instead of a Python loop.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.full_mask = (1 << (size * size)) - 1
+        self.rim_mask = 0
+        for r, c in get_rim_cells(size):
+            self.rim_mask |= 1 << (r * size + c)
+
+        self.line_masks: Tuple[Tuple[int, Tuple[Tuple[int, int], ...]], ...] = tuple(
+            (sum(1 << (r * size + c) for r, c in coords), coords) for coords in get_line_coords(size)
+        )
+
+        # move -> (keep mask, moving segment mask, left shift, right shift, target bit)
+        self.shifts: Dict[Move, Tuple[int, int, int, int, int]] = {}
+        for (sr, sc), targets in get_source_targets(size).items():
+            for tr, tc in targets:
+                self.shifts[(sr, sc, tr, tc)] = self._build_shift(sr, sc, tr, tc)
+
+        # source bit -> moves from that source, in agent_utils order
+        self.moves_by_source: Dict[int, Tuple[Move, ...]] = {
+            1 << (sr * size + sc): tuple((sr, sc, tr, tc) for tr, tc in targets)
+            for (sr, sc), targets in get_source_targets(size).items()
+        }
+
+    def _build_shift(self, sr: int, sc: int, tr: int, tc: int) -> Tuple[int, int, int, int, int]:
+        n = self.size
+        bit = lambda r, c: 1 << (r * n + c)
+        if sr == tr:
+            lo, hi = min(sc, tc), max(sc, tc)
+            span = sum(bit(sr, c) for c in range(lo, hi + 1))
+            if tc < sc:
+                segment = sum(bit(sr, c) for c in range(tc, sc))
+                left, right = 1, 0
+            else:
+                segment = sum(bit(sr, c) for c in range(sc + 1, tc + 1))
+                left, right = 0, 1
+        else:
+            lo, hi = min(sr, tr), max(sr, tr)
+            span = sum(bit(r, sc) for r in range(lo, hi + 1))
+            if tr < sr:
+                segment = sum(bit(r, sc) for r in range(tr, sr))
+                left, right = n, 0
+            else:
+                segment = sum(bit(r, sc) for r in range(sr + 1, tr + 1))
+                left, right = 0, n
+        return self.full_mask & ~span, segment, left, right, bit(tr, tc)
+
+
+@lru_cache(maxsize=None)
+def get_tables(size: int) -> BitboardTables:
+    if not 3 <= size <= 5:
+        raise ValueError("Board size must be between 3 and 5.")
+    return BitboardTables(size)
+
+
+def pack_board(board: Board) -> Tuple[int, int]:
+    """
+    Converts a list-of-lists board into (x_mask, o_mask).
+    """
+    size = len(board)
+    x_mask = o_mask = 0
+    for r in range(size):
+        for c in range(size):
+            cell = board[r][c]
+            if cell == 'X':
+                x_mask |= 1 << (r * size + c)
+            elif cell == 'O':
+                o_mask |= 1 << (r * size + c)
+    return x_mask, o_mask
+
+
+def unpack_board(x_mask: int, o_mask: int, size: int) -> Board:
+    """
+    Converts (x_mask, o_mask) back into the list-of-lists format used by game.py.
+    """
+    board: Board = []
+    for r in range(size):
+        row: List[Optional[str]] = []
+        for c in range(size):
+            b = 1 << (r * size + c)
+            row.append('X' if x_mask & b else 'O' if o_mask & b else None)
+        board.append(row)
+    return board
+
+
+def apply_move_masks(x_mask: int, o_mask: int, move: Move, player_index: int,
+                     tables: BitboardTables) -> Tuple[int, int]:
+    """
+    Applies a (pre-validated) move and returns the new (x_mask, o_mask).
+    """
+    keep, segment, left, right, tgt = tables.shifts[move]
+    x_mask = (x_mask & keep) | (((x_mask & segment) << left) >> right)
+    o_mask = (o_mask & keep) | (((o_mask & segment) << left) >> right)
+    if player_index == 0:
+        x_mask |= tgt
+    else:
+        o_mask |= tgt
+    return x_mask, o_mask
+
+
+def find_winner(x_mask: int, o_mask: int, tables: BitboardTables) -> Optional[int]:
+    """
+    Returns the index of the winning player, resolving double wins in PLAYERS order.
+    """
+    for player_index, mask in ((0, x_mask), (1, o_mask)):
+        for line, _ in tables.line_masks:
+            if mask & line == line:
+                return player_index
+    return None
+
+
+def get_valid_moves_masks(x_mask: int, o_mask: int, player_index: int,
+                          tables: BitboardTables) -> List[Move]:
+    """
+    Lists every legal move for the given side, in the same order as agent_utils.get_all_valid_moves.
+    """
+    selectable = tables.rim_mask & ~(x_mask | o_mask)
+    if not selectable:
+        selectable = tables.rim_mask & (x_mask if player_index == 0 else o_mask)
+    moves: List[Move] = []
+    while selectable:
+        low_bit = selectable & -selectable
+        moves.extend(tables.moves_by_source[low_bit])
+        selectable ^= low_bit
+    return moves
+
+
+class BitboardGame:
+    """
+    Drop-in fast path for XOShiftGame that stores one integer mask per player.
+    """
+    EMPTY = None
+    PLAYERS = ['X', 'O']
+
+    def __init__(self, size: int = 5):
+        self.tables = get_tables(size)
+        self.size = size
+        self.masks = [0, 0]
+        self.current_player_index = 0
+        self.winner: Optional[str] = None
+        self.last_move = None
+        self.winning_line_coords: Optional[List[Tuple[int, int]]] = None
+
+    @classmethod
+    def from_board(cls, board: Board, current_player_index: int = 0) -> "BitboardGame":
+        game = cls(len(board))
+        game.masks = list(pack_board(board))
+        game.current_player_index = current_player_index
+        game.check_winner()
+        return game
+
+    @property
+    def board(self) -> Board:
+        return unpack_board(self.masks[0], self.masks[1], self.size)
+
+    @property
+    def current_player(self) -> str:
+        return self.PLAYERS[self.current_player_index]
+
+    def switch_player(self) -> None:
+        self.current_player_index = (self.current_player_index + 1) % len(self.PLAYERS)
+
+    def is_valid_selection(self, row: int, col: int, player_symbol: str) -> bool:
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            return False
+        bit = 1 << (row * self.size + col)
+        if not self.tables.rim_mask & bit:
+            return False
+        x_mask, o_mask = self.masks
+        if self.tables.rim_mask & ~(x_mask | o_mask):
+            return not (x_mask | o_mask) & bit
+        return bool(self.masks[self.PLAYERS.index(player_symbol)] & bit)
+
+    def is_valid_target(self, src_row: int, src_col: int, tgt_row: int, tgt_col: int) -> bool:
+        if src_row == tgt_row and src_col == tgt_col:
+            return False
+
+        is_valid_row_target = (src_row == tgt_row) and \
+                              (tgt_col == 0 or tgt_col == self.size - 1)
+        is_valid_col_target = (src_col == tgt_col) and \
+                              (tgt_row == 0 or tgt_row == self.size - 1)
+        return is_valid_row_target or is_valid_col_target
+
+    def get_last_move(self):
+        return self.last_move
+
+    def get_all_valid_moves(self, player_symbol: str) -> List[Move]:
+        return get_valid_moves_masks(self.masks[0], self.masks[1], self.PLAYERS.index(player_symbol), self.tables)
+
+    def apply_move(self,
+                   src_row: int, src_col: int,
+                   tgt_row: int, tgt_col: int,
+                   player_symbol: str) -> bool:
+        if self.winner:
+            return False
+
+        if (src_row, src_col, tgt_row, tgt_col) not in self.tables.shifts:
+            return False
+        if not self.is_valid_selection(src_row, src_col, player_symbol):
+            return False
+        if not self.is_valid_target(src_row, src_col, tgt_row, tgt_col):
+            return False
+
+        move = (src_row, src_col, tgt_row, tgt_col)
+        self.masks = list(apply_move_masks(self.masks[0], self.masks[1], move,
+                                           self.PLAYERS.index(player_symbol), self.tables))
+        self.last_move = (src_row, src_col, tgt_row, tgt_col, player_symbol)
+        self.check_winner()
+        return True
+
+    def check_winner(self) -> None:
+        """
+        Same contract as XOShiftGame.check_winner, using the precomputed line masks.
+        """
+        self.winner = None
+        self.winning_line_coords = None
+        for player_index, mask in enumerate(self.masks):
+            for line, coords in self.tables.line_masks:
+                if mask & line == line:
+                    self.winner = self.PLAYERS[player_index]
+                    self.winning_line_coords = list(coords)
+                    return
+
+    def is_board_full(self) -> bool:
+        return (self.masks[0] | self.masks[1]) == self.tables.full_mask
+
+
+def verify_against_reference(games_per_size: int = 200, seed: int = 0) -> None:
+    """
+    Plays random games on XOShiftGame and BitboardGame side by side and asserts
+    that boards, winners, winning lines and move validity agree at every step.
+    Some of the moves tried are off the board (negative or too large
+    coordinates) and must be rejected by both.
+    """
+    from agent_utils import get_all_valid_moves
+    from game import XOShiftGame
+
+    rng = random.Random(seed)
+    for size in range(3, 6):
+        cells = [(r, c) for r in range(size) for c in range(size)]
+        off_board = [(r, c) for r in range(-2, size + 2) for c in range(-2, size + 2)
+                     if not (0 <= r < size and 0 <= c < size)]
+        for _ in range(games_per_size):
+            reference = XOShiftGame(size)
+            fast = BitboardGame(size)
+            for _ in range(rng.randint(1, 60)):
+                symbol = reference.current_player
+                for r, c in cells:
+                    assert fast.is_valid_selection(r, c, symbol) == reference.is_valid_selection(r, c, symbol)
+                moves = get_all_valid_moves(reference.board, symbol)
+                assert fast.get_all_valid_moves(symbol) == moves
+                for r, c in rng.sample(off_board, 4):
+                    assert not fast.is_valid_selection(r, c, symbol)
+                    assert not reference.is_valid_selection(r, c, symbol)
+                roll = rng.random()
+                if roll < 0.05:
+                    move = (*rng.choice(off_board + cells), *rng.choice(off_board + cells))
+                elif roll < 0.1:
+                    move = (*rng.choice(cells), *rng.choice(cells))
+                else:
+                    move = rng.choice(moves)
+                assert fast.apply_move(*move, symbol) == reference.apply_move(*move, symbol)
+                assert fast.board == reference.board
+                assert fast.winner == reference.winner
+                assert fast.winning_line_coords == reference.winning_line_coords
+                if reference.winner:
+                    break
+                reference.switch_player()
+                fast.switch_player()
+
+
+if __name__ == "__main__":
+    verify_against_reference()
+    print("BitboardGame matches XOShiftGame on random games for sizes 3-5.")
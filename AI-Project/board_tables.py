@@ -0,0 +1,124 @@
+import random
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+Cell = Tuple[int, int]
+Move = Tuple[int, int, int, int]
+
+
+@lru_cache(maxsize=None)
+def get_line_coords(size: int) -> Tuple[Tuple[Cell, ...], ...]:
+    """
+    Returns every winning line of a board of the given size.
+
+    Lines are listed in the order XOShiftGame.check_winner scans them:
+    rows, then columns, then the main diagonal, then the anti-diagonal.
+    """
+    rows = [tuple((r, c) for c in range(size)) for r in range(size)]
+    cols = [tuple((r, c) for r in range(size)) for c in range(size)]
+    main_diag = tuple((i, i) for i in range(size))
+    anti_diag = tuple((i, size - 1 - i) for i in range(size))
+    return tuple(rows + cols + [main_diag, anti_diag])
+
+
+@lru_cache(maxsize=None)
+def get_rim_cells(size: int) -> Tuple[Cell, ...]:
+    """
+    Returns the rim (border) cells of a board of the given size in row-major order.
+    """
+    return tuple(
+        (r, c)
+        for r in range(size)
+        for c in range(size)
+        if r == 0 or r == size - 1 or c == 0 or c == size - 1
+    )
+
+
+@lru_cache(maxsize=None)
+def get_rim_lookup(size: int) -> Tuple[Tuple[bool, ...], ...]:
+    """
+    Returns a size x size grid where grid[r][c] is True for rim cells.
+    """
+    rim = set(get_rim_cells(size))
+    return tuple(tuple((r, c) in rim for c in range(size)) for r in range(size))
+
+
+@lru_cache(maxsize=None)
+def get_source_targets(size: int) -> Dict[Cell, Tuple[Cell, ...]]:
+    """
+    Maps every rim cell to the edge cells it may be pushed to.
+
+    The candidates are the two ends of the source's row and of its column,
+    minus the source itself. They are de-duplicated through a set exactly like
+    agent_utils.get_all_valid_moves, so both produce moves in the same order.
+    """
+    targets: Dict[Cell, Tuple[Cell, ...]] = {}
+    for sr, sc in get_rim_cells(size):
+        candidates = set()
+        for cell in ((sr, 0), (sr, size - 1), (0, sc), (size - 1, sc)):
+            if cell != (sr, sc):
+                candidates.add(cell)
+        targets[(sr, sc)] = tuple(candidates)
+    return targets
+
+
+@lru_cache(maxsize=None)
+def get_move_spans(size: int) -> Dict[Move, Tuple[Cell, ...]]:
+    """
+    Maps every legal (src, tgt) pair to the cells its shift rewrites,
+    from the source to the target inclusive.
+    """
+    spans: Dict[Move, Tuple[Cell, ...]] = {}
+    for (sr, sc), targets in get_source_targets(size).items():
+        for tr, tc in targets:
+            if sr == tr:
+                step = 1 if tc > sc else -1
+                spans[(sr, sc, tr, tc)] = tuple((sr, c) for c in range(sc, tc + step, step))
+            else:
+                step = 1 if tr > sr else -1
+                spans[(sr, sc, tr, tc)] = tuple((r, sc) for r in range(sr, tr + step, step))
+    return spans
+
+
+@lru_cache(maxsize=None)
+def get_touched_lines(size: int) -> Dict[Move, Tuple[int, ...]]:
+    """
+    Maps every legal move to the indices (into get_line_coords) of the lines
+    that contain at least one cell of its span: the shifted line itself, the
+    lines crossing it and any diagonal through the span. Indices are sorted,
+    so scanning them keeps check_winner's line order.
+    """
+    lines = get_line_coords(size)
+    touched: Dict[Move, Tuple[int, ...]] = {}
+    for move, span in get_move_spans(size).items():
+        span_cells = set(span)
+        touched[move] = tuple(i for i, coords in enumerate(lines) if span_cells.intersection(coords))
+    return touched
+
+
+@lru_cache(maxsize=None)
+def get_move_rim_spans(size: int) -> Dict[Move, Tuple[Cell, ...]]:
+    """
+    Maps every legal move to the rim cells inside its span, i.e. the only rim
+    cells whose contents the move can change.
+    """
+    rim = set(get_rim_cells(size))
+    return {move: tuple(cell for cell in span if cell in rim) for move, span in get_move_spans(size).items()}
+
+
+@lru_cache(maxsize=None)
+def get_zobrist_keys(size: int) -> Tuple[Tuple[Tuple[Dict[Optional[str], int], ...], ...], int]:
+    """
+    Returns the 64-bit Zobrist keys for a board of the given size.
+
+    The first element is a grid with one {None: 0, 'X': key, 'O': key} dict per
+    cell, so a cell's contribution is keys[r][c][board[r][c]]. The second is the
+    key XORed in when 'O' is to move. Keys come from a fixed seed, so every
+    process agrees on them.
+    """
+    rng = random.Random(0x5EED0000 + size)
+    cell_keys = tuple(
+        tuple({None: 0, 'X': rng.getrandbits(64), 'O': rng.getrandbits(64)} for _ in range(size))
+        for _ in range(size)
+    )
+    return cell_keys, rng.getrandbits(64)
@@ -1,4 +1,7 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from board_tables import (get_line_coords, get_move_rim_spans, get_move_spans, get_rim_cells, get_rim_lookup,
+                          get_touched_lines, get_zobrist_keys)
 
 
 class XOShiftGame:
@@ -12,13 +15,74 @@ class XOShiftGame:
         if not 3 <= size <= 5:
             raise ValueError("Board size must be between 3 and 5.")
         self.size = size
+        self._rim_lookup = get_rim_lookup(size)
+        self._move_rim_spans = get_move_rim_spans(size)
+        self._move_spans = get_move_spans(size)
+        self._zobrist_cells, self._zobrist_side = get_zobrist_keys(size)
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clears the board and all derived state back to the start of a game.
+        """
         self.board: List[List[Optional[str]]] = [
-            [self.EMPTY for _ in range(size)] for _ in range(size)
+            [self.EMPTY for _ in range(self.size)] for _ in range(self.size)
         ]
         self.current_player_index = 0
         self.winner: Optional[str] = None
         self.last_move = None
         self.winning_line_coords: Optional[List[Tuple[int, int]]] = None  # Stores winning line
+        self.empty_rim_count = len(get_rim_cells(self.size))  # Kept up to date by every move
+        self.board_hash = 0  # Zobrist hash of the cells only, kept up to date by every move
+        self._undo_stack: List[tuple] = []  # One record per make_move, consumed by unmake_move
+        self._start_history()
+
+    def _start_history(self) -> None:
+        # position_hash -> how often the position occurred in this game (see record_position)
+        self.position_counts: Dict[int, int] = {self.position_hash: 1}
+        self.position_history: List[int] = [self.position_hash]
+
+    def load_board(self, board: List[List[Optional[str]]], current_player_index: int = 0) -> None:
+        """
+        Replaces the position with a copy of `board` and recomputes all derived
+        state (empty-rim counter, hash, winner) from scratch.
+        """
+        if len(board) != self.size:
+            raise ValueError(f"Expected a {self.size}x{self.size} board.")
+        self.reset()
+        self.board = [[cell for cell in row] for row in board]
+        self.current_player_index = current_player_index
+        self.empty_rim_count = self._count_empty(get_rim_cells(self.size))
+        self.board_hash = self._hash_cells((r, c) for r in range(self.size) for c in range(self.size))
+        self._start_history()
+        self.check_winner()
+
+    @property
+    def position_hash(self) -> int:
+        """
+        64-bit Zobrist key of the board plus the side to move.
+        """
+        return self.board_hash ^ self._zobrist_side if self.current_player_index else self.board_hash
+
+    def record_position(self) -> int:
+        """
+        Adds the current position (board and side to move) to the game's
+        history and returns how many times it has occurred, this time included.
+
+        Called by the game loop after every turn; make_move does not record,
+        so searches on a copy of the game never touch the history.
+        """
+        key = self.position_hash
+        count = self.position_counts.get(key, 0) + 1
+        self.position_counts[key] = count
+        self.position_history.append(key)
+        return count
+
+    def repetition_count(self) -> int:
+        """
+        How many times the current position has been recorded.
+        """
+        return self.position_counts.get(self.position_hash, 0)
 
     @property
     def current_player(self) -> str:
@@ -27,22 +91,20 @@ class XOShiftGame:
     def switch_player(self) -> None:
         self.current_player_index = (self.current_player_index + 1) % len(self.PLAYERS)
 
+    def pass_turn(self) -> None:
+        """
+        Hands the turn to the other player and records the new position; the
+        game loops call this after every turn that does not end the game.
+        """
+        self.switch_player()
+        self.record_position()
+
     def is_valid_selection(self, row: int, col: int, player_symbol: str) -> bool:
-        if not (row == 0 or row == self.size - 1 or col == 0 or col == self.size - 1):
+        if not (0 <= row < self.size and 0 <= col < self.size) or not self._rim_lookup[row][col]:
             return False
 
-        has_empty_rim_cell = False
-        for r_idx in range(self.size):
-            for c_idx in range(self.size):
-                if r_idx == 0 or r_idx == self.size - 1 or c_idx == 0 or c_idx == self.size - 1:
-                    if self.board[r_idx][c_idx] == self.EMPTY:
-                        has_empty_rim_cell = True
-                        break
-            if has_empty_rim_cell:
-                break
-
         current_cell_value = self.board[row][col]
-        if has_empty_rim_cell:
+        if self.empty_rim_count:
             return current_cell_value == self.EMPTY
         else:
             return current_cell_value == player_symbol
@@ -67,11 +129,44 @@ class XOShiftGame:
         if self.winner:
             return False
 
+        # Only moves in the precomputed tables are on the board (rejects out-of-range and negative indices)
+        rim_span = self._move_rim_spans.get((src_row, src_col, tgt_row, tgt_col))
+        if rim_span is None:
+            return False
         if not self.is_valid_selection(src_row, src_col, player_symbol):
             return False
         if not self.is_valid_target(src_row, src_col, tgt_row, tgt_col):
             return False
 
+        span = self._move_spans[(src_row, src_col, tgt_row, tgt_col)]
+        empty_before = self._count_empty(rim_span)
+        hash_before = self._hash_cells(span)
+        self._shift_line(src_row, src_col, tgt_row, tgt_col)
+        self.board[tgt_row][tgt_col] = player_symbol
+        self.empty_rim_count += self._count_empty(rim_span) - empty_before
+        self.board_hash ^= hash_before ^ self._hash_cells(span)
+        self.last_move = (src_row, src_col, tgt_row, tgt_col, player_symbol)
+        self.check_winner_after_move(src_row, src_col, tgt_row, tgt_col)
+        return True
+
+    def _count_empty(self, cells) -> int:
+        return sum(1 for r, c in cells if self.board[r][c] == self.EMPTY)
+
+    def _hash_cells(self, cells) -> int:
+        """
+        XOR of the Zobrist keys of the given cells' current contents.
+        """
+        h = 0
+        for r, c in cells:
+            h ^= self._zobrist_cells[r][c][self.board[r][c]]
+        return h
+
+    def _shift_line(self, src_row: int, src_col: int, tgt_row: int, tgt_col: int) -> Optional[str]:
+        """
+        Removes the source piece and slides the cells between target and source
+        one step towards the source. Returns the removed (displaced) piece.
+        """
+        displaced = self.board[src_row][src_col]
         if src_row == tgt_row:
             if tgt_col < src_col:
                 for col_idx in range(src_col, tgt_col, -1):
@@ -86,11 +181,70 @@ class XOShiftGame:
             else:
                 for row_idx in range(src_row, tgt_row):
                     self.board[row_idx][src_col] = self.board[row_idx + 1][src_col]
+        return displaced
 
+    def _unshift_line(self, src_row: int, src_col: int, tgt_row: int, tgt_col: int,
+                      displaced: Optional[str]) -> None:
+        """
+        Inverse of _shift_line: slides the line back towards the target and puts
+        the displaced piece back on the source cell.
+        """
+        if src_row == tgt_row:
+            if tgt_col < src_col:
+                for col_idx in range(tgt_col, src_col):
+                    self.board[src_row][col_idx] = self.board[src_row][col_idx + 1]
+            else:
+                for col_idx in range(tgt_col, src_col, -1):
+                    self.board[src_row][col_idx] = self.board[src_row][col_idx - 1]
+        else:
+            if tgt_row < src_row:
+                for row_idx in range(tgt_row, src_row):
+                    self.board[row_idx][src_col] = self.board[row_idx + 1][src_col]
+            else:
+                for row_idx in range(tgt_row, src_row, -1):
+                    self.board[row_idx][src_col] = self.board[row_idx - 1][src_col]
+        self.board[src_row][src_col] = displaced
+
+    def make_move(self, src_row: int, src_col: int, tgt_row: int, tgt_col: int) -> None:
+        """
+        Search-oriented counterpart of apply_move for the current player.
+
+        The move is NOT validated; it must come from a legal move generator such
+        as agent_utils.get_all_valid_moves. Everything unmake_move needs (the
+        displaced source piece, the previous winner and the previous player) is
+        pushed on an undo stack, so a search can walk the tree on this single
+        board without copying it. The player is switched unless the move wins.
+        """
+        rim_span = self._move_rim_spans[(src_row, src_col, tgt_row, tgt_col)]
+        span = self._move_spans[(src_row, src_col, tgt_row, tgt_col)]
+        empty_before = self._count_empty(rim_span)
+        hash_before = self._hash_cells(span)
+        self._undo_stack.append((src_row, src_col, tgt_row, tgt_col,
+                                 self._shift_line(src_row, src_col, tgt_row, tgt_col),
+                                 self.winner, self.winning_line_coords,
+                                 self.current_player_index, self.last_move,
+                                 self.empty_rim_count, self.board_hash))
+        player_symbol = self.current_player
         self.board[tgt_row][tgt_col] = player_symbol
+        self.empty_rim_count += self._count_empty(rim_span) - empty_before
+        self.board_hash ^= hash_before ^ self._hash_cells(span)
         self.last_move = (src_row, src_col, tgt_row, tgt_col, player_symbol)
-        self.check_winner()
-        return True
+        if self.winner:
+            self.check_winner()
+        else:
+            self.check_winner_after_move(src_row, src_col, tgt_row, tgt_col)
+        if not self.winner:
+            self.switch_player()
+
+    def unmake_move(self) -> None:
+        """
+        Takes back the most recent make_move, restoring only the shifted line.
+        """
+        (src_row, src_col, tgt_row, tgt_col, displaced,
+         self.winner, self.winning_line_coords,
+         self.current_player_index, self.last_move,
+         self.empty_rim_count, self.board_hash) = self._undo_stack.pop()
+        self._unshift_line(src_row, src_col, tgt_row, tgt_col, displaced)
 
     def check_winner(self) -> None:
         """
@@ -129,6 +283,26 @@ class XOShiftGame:
                 self.winning_line_coords = [(i, n - 1 - i) for i in range(n)]
                 return
 
+    def check_winner_after_move(self, src_row: int, src_col: int, tgt_row: int, tgt_col: int) -> None:
+        """
+        Incremental check_winner for a board that had no complete line before the
+        given move: only the lines through the shifted cells can have changed, so
+        only those are re-examined. Lines are scanned per symbol in PLAYERS order
+        and in check_winner's line order, so the result is identical.
+        """
+        self.winner = None
+        self.winning_line_coords = None
+        lines = get_line_coords(self.size)
+        touched = get_touched_lines(self.size)[(src_row, src_col, tgt_row, tgt_col)]
+
+        for symbol in self.PLAYERS:
+            for line_idx in touched:
+                coords = lines[line_idx]
+                if all(self.board[r][c] == symbol for r, c in coords):
+                    self.winner = symbol
+                    self.winning_line_coords = list(coords)
+                    return
+
     def is_board_full(self) -> bool:
         for r in range(self.size):
             for c in range(self.size):
@@ -0,0 +1,311 @@
+import random
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from board_tables import Move, get_line_coords, get_move_spans
+
+Board = List[List[Optional[str]]]
+# One line code's entry: (score for X, 1 if X owns the whole line, 1 if O does)
+LineEntry = Tuple[int, int, int]
+
+# A line of n cells is the base-3 number whose digit i is its i-th cell (in get_line_coords order)
+CELL_DIGITS = {None: 0, 'X': 1, 'O': 2}
+
+
+def build_line_table(size: int, line_scores: Sequence[int]) -> Tuple[LineEntry, ...]:
+    """
+    Scores all 3**size codes of a line for X:
+    line_scores[min(X pieces, 4)] - line_scores[min(O pieces, 4)]. A complete
+    line is only flagged (score 0), since a position with one is scored as a
+    win or loss as a whole; wins are read from the same table.
+    """
+    top = len(line_scores) - 1
+    table = []
+    for code in range(3 ** size):
+        digits = []
+        for _ in range(size):
+            code, digit = divmod(code, 3)
+            digits.append(digit)
+        x, o = digits.count(1), digits.count(2)
+        if x == size:
+            table.append((0, 1, 0))
+        elif o == size:
+            table.append((0, 0, 1))
+        else:
+            table.append((line_scores[min(x, top)] - line_scores[min(o, top)], 0, 0))
+    return tuple(table)
+
+
+@lru_cache(maxsize=None)
+def get_line_codes(size: int) -> Dict[Tuple[Optional[str], ...], int]:
+    """
+    Maps every tuple of `size` cell values to its line code.
+    """
+    codes: Dict[Tuple[Optional[str], ...], int] = {(): 0}
+    for position in range(size):
+        weight = 3 ** position
+        codes = {cells + (cell,): code + digit * weight
+                 for cells, code in codes.items() for cell, digit in CELL_DIGITS.items()}
+    return codes
+
+
+class LineCodeEvaluator:
+    """
+    Line-table evaluation kept up to date across make/unmake.
+
+    line_tables maps each board size to its build_line_table() table. The
+    position scores win_score if the side has a complete line, -win_score if
+    only the opponent has one, otherwise the sum of the table scores of every
+    row, column and diagonal (negated for O), exactly like your_agent.evaluate_board.
+    Since evaluate_board reads the same tables, the saving at the leaves is
+    roughly cancelled by the push/pop at every interior and ordering node
+    (see benchmark()), so your_agent searches with evaluate_board.
+
+    Instead of rebuilding the lines at every leaf, it keeps each line's code
+    (in get_line_coords order), the number of complete lines per player and
+    the total score for X. A move only rewrites the cells of its span, so
+    push() adds digit * 3**position to the code of each line through a cell
+    that changes, re-reads those lines' table entries and saves what it
+    overwrote; pop() puts it back. The search drives it:
+      load(board) when the search board is set up,
+      push(board, move, player_symbol) just BEFORE game.make_move(*move),
+      pop() right after game.unmake_move().
+    Calling the evaluator then reads the totals; the board argument is only
+    there to match the Evaluator signature and is assumed to be the board
+    the pushes describe.
+    """
+
+    def __init__(self, line_tables: Dict[int, Tuple[LineEntry, ...]], win_score: int):
+        self.line_tables = line_tables
+        self.win_score = win_score
+        self.size = 0
+        self.codes: List[int] = []
+        self.score = 0  # sum of the line scores, from X's point of view
+        self.x_lines = 0  # complete lines per player
+        self.o_lines = 0
+        self._stack: List[tuple] = []
+
+    def _set_size(self, size: int) -> None:
+        self.size = size
+        self._table = self.line_tables[size]
+        # cell_lines[r][c]: (line index, weight of the cell's digit in that line's code)
+        cell_lines = [[[] for _ in range(size)] for _ in range(size)]
+        for index, coords in enumerate(get_line_coords(size)):
+            for position, (r, c) in enumerate(coords):
+                cell_lines[r][c].append((index, 3 ** position))
+        self._cell_lines = tuple(tuple(tuple(entries) for entries in row) for row in cell_lines)
+        self._spans = get_move_spans(size)
+
+    def load(self, board: Board) -> None:
+        """
+        Recomputes every line code of `board` from scratch and clears the undo stack.
+        """
+        size = len(board)
+        if size != self.size:
+            self._set_size(size)
+        line_codes = get_line_codes(size)
+        self.codes = [line_codes[tuple(board[r][c] for r, c in coords)] for coords in get_line_coords(size)]
+        entries = [self._table[code] for code in self.codes]
+        self.score = sum(entry[0] for entry in entries)
+        self.x_lines = sum(entry[1] for entry in entries)
+        self.o_lines = sum(entry[2] for entry in entries)
+        self._stack = []
+
+    def push(self, board: Board, move: Move, player_symbol: str) -> None:
+        """
+        Updates the codes for `player_symbol` playing `move` on `board`
+        (the board before the move).
+        """
+        span = self._spans[move]
+        # After the shift, each span cell holds its neighbour towards the
+        # target and the target holds the mover's piece
+        before = [board[r][c] for r, c in span]
+        after = before[1:]
+        after.append(player_symbol)
+
+        codes = self.codes
+        table = self._table
+        changes = []
+        score, x_lines, o_lines = self.score, self.x_lines, self.o_lines
+        for (r, c), old, new in zip(span, before, after):
+            if old == new:
+                continue
+            delta = CELL_DIGITS[new] - CELL_DIGITS[old]
+            for line, weight in self._cell_lines[r][c]:
+                code = codes[line]
+                changes.append((line, code))
+                old_score, old_x, old_o = table[code]
+                code += delta * weight
+                new_score, new_x, new_o = table[code]
+                score += new_score - old_score
+                x_lines += new_x - old_x
+                o_lines += new_o - old_o
+                codes[line] = code
+        self._stack.append((changes, self.score, self.x_lines, self.o_lines))
+        self.score, self.x_lines, self.o_lines = score, x_lines, o_lines
+
+    def pop(self) -> None:
+        """
+        Undoes the most recent push.
+        """
+        changes, self.score, self.x_lines, self.o_lines = self._stack.pop()
+        codes = self.codes
+        for line, code in reversed(changes):
+            codes[line] = code
+
+    def __call__(self, board: Board, player_symbol: str) -> int:
+        if player_symbol == 'X':
+            own_lines, opponent_lines = self.x_lines, self.o_lines
+        else:
+            own_lines, opponent_lines = self.o_lines, self.x_lines
+        if own_lines:
+            return self.win_score
+        if opponent_lines:
+            return -self.win_score
+        return self.score if player_symbol == 'X' else -self.score
+
+
+def _reference_evaluate(board: Board, player_symbol: str, line_scores: Sequence[int], win_score: int) -> int:
+    """
+    The count-based evaluation your_agent used before the line tables, kept for verification.
+    """
+    opponent = 'O' if player_symbol == 'X' else 'X'
+    lines = [[board[r][c] for r, c in coords] for coords in get_line_coords(len(board))]
+    if any(line.count(player_symbol) == len(line) for line in lines):
+        return win_score
+    if any(line.count(opponent) == len(line) for line in lines):
+        return -win_score
+    top = len(line_scores) - 1
+    return sum(line_scores[min(line.count(player_symbol), top)] - line_scores[min(line.count(opponent), top)]
+               for line in lines)
+
+
+def verify_against_reference(walks_per_size: int = 200, seed: int = 0) -> None:
+    """
+    Walks random make/unmake sequences on XOShiftGame and asserts that the
+    incremental score, your_agent.evaluate_board and the count-based
+    reference agree for both sides at every step, and that a NegamaxSearch
+    returns the same move, score and node count with each of them.
+    """
+    from agent_utils import get_all_valid_moves
+    from game import XOShiftGame
+    from search import NegamaxSearch, order_by_heuristics
+    from your_agent import LINE_SCORES, LINE_TABLES, WIN_SCORE, evaluate_board
+
+    def reference(board: Board, player_symbol: str) -> int:
+        return _reference_evaluate(board, player_symbol, LINE_SCORES, WIN_SCORE)
+
+    rng = random.Random(seed)
+    evaluator = LineCodeEvaluator(LINE_TABLES, WIN_SCORE)
+    for size in range(3, 6):
+        for _ in range(walks_per_size):
+            game = XOShiftGame(size)
+            evaluator.load(game.board)
+            depth = 0
+            for _ in range(rng.randint(1, 40)):
+                if depth and (game.winner or rng.random() < 0.3):
+                    game.unmake_move()
+                    evaluator.pop()
+                    depth -= 1
+                else:
+                    move = rng.choice(get_all_valid_moves(game.board, game.current_player))
+                    evaluator.push(game.board, move, game.current_player)
+                    game.make_move(*move)
+                    depth += 1
+                for side in ('X', 'O'):
+                    expected = reference(game.board, side)
+                    assert evaluator(game.board, side) == expected
+                    assert evaluate_board(game.board, side) == expected
+
+    for board, symbol in _sample_positions(5, 6, rng):
+        results = []
+        for evaluate in (reference, evaluate_board, LineCodeEvaluator(LINE_TABLES, WIN_SCORE)):
+            search = NegamaxSearch(evaluate, max_depth=3, depth_discount=0.4, order_moves=order_by_heuristics)
+            move = search.search(board, symbol, time_budget=1000.0)
+            results.append((move, search.best_score, search.nodes))
+        assert results[0] == results[1] == results[2], results
+
+
+def _sample_positions(size: int, count: int, rng: random.Random) -> List[Tuple[Board, str]]:
+    from agent_utils import get_all_valid_moves
+    from game import XOShiftGame
+
+    positions = []
+    game = XOShiftGame(size)
+    while len(positions) < count:
+        for _ in range(rng.randint(2, 12)):
+            symbol = game.current_player
+            game.apply_move(*rng.choice(get_all_valid_moves(game.board, symbol)), symbol)
+            if game.winner:
+                game.reset()
+            else:
+                game.switch_player()
+        positions.append(([row[:] for row in game.board], game.current_player))
+    return positions
+
+
+def benchmark(depths: Sequence[int] = (3, 4, 5), size: int = 5, positions: int = 6, seed: int = 0) -> None:
+    """
+    Prints the cost of scoring one child position with the count-based
+    reference, the table-based evaluate_board and LineCodeEvaluator (push +
+    evaluation + pop), then runs fixed-depth searches (your_agent's
+    configuration, without the transposition table so all visit the same
+    tree) with each and prints the time per node.
+    """
+    from agent_utils import get_all_valid_moves
+    from game import XOShiftGame
+    from search import NegamaxSearch, order_by_heuristics
+    from your_agent import DEPTH_DISCOUNT, LINE_SCORES, LINE_TABLES, WIN_SCORE, evaluate_board
+
+    def reference(board: Board, player_symbol: str) -> int:
+        return _reference_evaluate(board, player_symbol, LINE_SCORES, WIN_SCORE)
+
+    boards = _sample_positions(size, positions, random.Random(seed))
+    evaluator = LineCodeEvaluator(LINE_TABLES, WIN_SCORE)
+    reference_seconds = table_seconds = incremental_seconds = 0.0
+    leaves = 0
+    for board, symbol in boards:
+        game = XOShiftGame(size)
+        game.load_board(board, XOShiftGame.PLAYERS.index(symbol))
+        evaluator.load(board)
+        for move in get_all_valid_moves(board, symbol):
+            game.make_move(*move)
+            start = time.perf_counter()
+            reference(game.board, symbol)
+            reference_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            evaluate_board(game.board, symbol)
+            table_seconds += time.perf_counter() - start
+            game.unmake_move()
+            start = time.perf_counter()
+            evaluator.push(game.board, move, symbol)
+            evaluator(game.board, symbol)
+            evaluator.pop()
+            incremental_seconds += time.perf_counter() - start
+            leaves += 1
+    print(f"leaf cost: counting {reference_seconds / leaves * 1e6:.1f} us, "
+          f"line tables {table_seconds / leaves * 1e6:.1f} us, "
+          f"incremental codes {incremental_seconds / leaves * 1e6:.1f} us")
+
+    for depth in depths:
+        timings = []
+        for evaluate in (reference, evaluate_board, LineCodeEvaluator(LINE_TABLES, WIN_SCORE)):
+            search = NegamaxSearch(evaluate, max_depth=depth, depth_discount=DEPTH_DISCOUNT,
+                                   order_moves=order_by_heuristics)
+            nodes = 0
+            start = time.monotonic()
+            for board, symbol in boards:
+                search.search(board, symbol, time_budget=1000.0)
+                nodes += search.nodes
+            timings.append((time.monotonic() - start, nodes))
+        nodes = timings[0][1]
+        print(f"depth {depth}: {nodes} nodes, counting {timings[0][0] / nodes * 1e6:.1f} us/node, "
+              f"line tables {timings[1][0] / nodes * 1e6:.1f} us/node, "
+              f"incremental codes {timings[2][0] / nodes * 1e6:.1f} us/node")
+
+
+if __name__ == "__main__":
+    verify_against_reference()
+    print("LineCodeEvaluator and evaluate_board match the count-based evaluation for sizes 3-5.")
+    benchmark()
@@ -2,27 +2,30 @@ import datetime
 import json
 import multiprocessing
 import os
-import queue
 import sys
 import pygame
 
-from typing import Optional, Callable, List, Dict, Any
-from agent_loader import load_agent
+from typing import Optional, List, Dict, Any
+from agent_runner import AgentWorker, ponder_is_fair
 from game import XOShiftGame
 from ui import XOShiftUI, REPLAYS_DIR
 
 AGENT_TIME_LIMIT = 2.0
+# Let agents that define agent_ponder think on the opponent's time. Applies to
+# both agents of a match, and only on machines with a spare core per agent.
+# This is the default of the menu's Pondering toggle (tournament.py: --ponder).
+PONDER = False
 MAX_TURNS = 250
+# The game is drawn when the same position (board and side to move) occurs this
+# many times; None leaves only the MAX_TURNS limit
+REPETITION_LIMIT: Optional[int] = 3
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 850
 
-def agent_process_wrapper(agent_fn: Callable, board_copy: List[List[Optional[str]]],
-                          player_symbol: str, result_queue: multiprocessing.Queue):
-    try:
-        move = agent_fn(board_copy, player_symbol)
-        result_queue.put(move)
-    except Exception as e:
-        result_queue.put(e)
+def _close_agents(*agents: Optional[AgentWorker]):
+    for agent in agents:
+        if agent:
+            agent.close()
 
 def main_loop():
     pygame.init()
@@ -40,10 +43,12 @@ def main_loop():
     clock = pygame.time.Clock()
 
     ui = XOShiftUI(screen)
+    ui.ponder_enabled = PONDER
     game: Optional[XOShiftGame] = None
 
-    agent1: Optional[Callable] = None
-    agent2: Optional[Callable] = None
+    # One persistent worker process per agent, kept for the whole game
+    agent1: Optional[AgentWorker] = None
+    agent2: Optional[AgentWorker] = None
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     agent1_path_config = os.path.join(BASE_DIR, "sample_agent.py") #.    sample_agent   .py
     agent2_path_config = os.path.join(BASE_DIR, "your_agent.py")
@@ -62,6 +67,10 @@ def main_loop():
             game.winner = "Draw"
             ui.state = XOShiftUI.STATE_GAME_OVER
             print(f"Game ended in a draw after reaching the maximum of {MAX_TURNS} turns.")
+        elif game and not game.winner and REPETITION_LIMIT and game.repetition_count() >= REPETITION_LIMIT:
+            game.winner = "Draw"
+            ui.state = XOShiftUI.STATE_GAME_OVER
+            print(f"Game ended in a draw: the same position occurred {REPETITION_LIMIT} times.")
 
         events = pygame.event.get()
         for event in events:
@@ -115,18 +124,30 @@ def main_loop():
                 current_move_history = []
                 ui.replay_finished = False
 
+                _close_agents(agent1, agent2)
                 agent1, agent2 = None, None
+                ponder_requested = action.get("ponder", PONDER)
+                ponder = ponder_requested and ponder_is_fair()
+                if ponder_requested and not ponder:
+                    print("Pondering disabled: not enough CPU cores for both agents to ponder fairly.")
                 if game_mode == "human-agent":
                     try:
-                        agent2 = load_agent(agent2_path_config)
+                        agent2 = AgentWorker(agent2_path_config, AGENT_TIME_LIMIT, ponder)
+                        agent2.start()
                     except Exception as e:
                         print(f"Error loading agent 2: {e}. Mode to human-human.")
+                        _close_agents(agent2)
+                        agent2 = None
                 elif game_mode == "agent-agent":
                     try:
-                        agent1 = load_agent(agent1_path_config)
-                        agent2 = load_agent(agent2_path_config)
+                        agent1 = AgentWorker(agent1_path_config, AGENT_TIME_LIMIT, ponder)
+                        agent2 = AgentWorker(agent2_path_config, AGENT_TIME_LIMIT, ponder)
+                        agent1.start()
+                        agent2.start()
                     except Exception as e:
                         print(f"Error loading agents: {e}. Mode to human-human.")
+                        _close_agents(agent1, agent2)
+                        agent1, agent2 = None, None
 
                 if game:
                     ui.state = XOShiftUI.STATE_SELECT
@@ -179,7 +200,7 @@ def main_loop():
                             "tgt_r": tr, "tgt_c": tc
                         })
                     if not game.winner:
-                        game.switch_player()
+                        game.pass_turn()
                         is_next_player_human = not ((ui.selected_mode == "agent-agent") or (
                                 ui.selected_mode == "human-agent" and game.current_player_index == 1 and agent2))
                         ui.state = XOShiftUI.STATE_SELECT if is_next_player_human else XOShiftUI.STATE_WAITING
@@ -188,6 +209,8 @@ def main_loop():
                     ui.selected_cell = None
 
             elif action["action"] == "return_to_menu_ingame":
+                _close_agents(agent1, agent2)
+                agent1, agent2 = None, None
                 game = None
                 ui.set_game(None)
                 current_move_history = []
@@ -217,6 +240,8 @@ def main_loop():
                     except Exception as e:
                         print(f"Error saving game history to {filepath}: {e}")
 
+                _close_agents(agent1, agent2)
+                agent1, agent2 = None, None
                 game = None
                 ui.set_game(None)
                 current_move_history = []
@@ -230,7 +255,7 @@ def main_loop():
                 _apply_replay_moves_to_index(game, loaded_replay_moves, 0)
 
         if game and not game.winner and ui.state == XOShiftUI.STATE_WAITING:
-            active_agent: Optional[Callable] = None
+            active_agent: Optional[AgentWorker] = None
             player_whose_turn_is_it = game.current_player
 
             if ui.selected_mode == "human-agent" and game.current_player_index == 1 and agent2:
@@ -242,40 +267,20 @@ def main_loop():
                 ui.draw()
                 pygame.display.flip()
 
-                board_copy = [[cell for cell in row] for row in game.board]
-                result_queue = multiprocessing.Queue()
-                agent_process = multiprocessing.Process(target=agent_process_wrapper,
-                                                        args=(active_agent, board_copy, player_whose_turn_is_it,
-                                                              result_queue))
-                agent_process.start()
-                agent_move_coords, agent_exception, timed_out = None, None, False
-
                 try:
-                    agent_output = result_queue.get(timeout=AGENT_TIME_LIMIT)
-                    if isinstance(agent_output, Exception):
-                        agent_exception = agent_output
-                    else:
-                        agent_move_coords = agent_output
-                except queue.Empty:
-                    timed_out = True
+                    result = active_agent.request_move(game.board, player_whose_turn_is_it, game.position_counts)
+                    agent_move_coords, agent_exception, timed_out = result.move, result.exception, result.timed_out
                 except Exception as e:
-                    agent_exception = e
-
-                if agent_process.is_alive():
-                    agent_process.terminate()
-                agent_process.join(timeout=0.5)
-                if agent_process.is_alive():
-                    agent_process.kill()
-                    agent_process.join()
+                    agent_move_coords, agent_exception, timed_out = None, e, False
 
                 if agent_exception:
                     print(
                         f"Agent {player_whose_turn_is_it} crashed: {agent_exception}. Opponent's turn.")
-                    game.switch_player()
+                    game.pass_turn()
                 elif timed_out:
                     print(f"Agent {player_whose_turn_is_it} timed out. Opponent's turn.")
                     turn_count += 1
-                    game.switch_player()
+                    game.pass_turn()
                 elif agent_move_coords:
                     sr, sc, tr, tc = agent_move_coords
                     if game.apply_move(sr, sc, tr, tc, player_whose_turn_is_it):
@@ -284,14 +289,15 @@ def main_loop():
                             current_move_history.append({"player": player_whose_turn_is_it, "src_r": sr, "src_c": sc,
                                                          "tgt_r": tr, "tgt_c": tc})
                         if not game.winner:
-                            game.switch_player()
+                            game.pass_turn()
+                            active_agent.ponder(game.board, player_whose_turn_is_it, game.position_counts)
                     else:
                         print(
                             f"Agent {player_whose_turn_is_it} invalid move: {agent_move_coords}. Opponent's turn.")
-                        game.switch_player()
+                        game.pass_turn()
                 else:
                     print(f"Agent {player_whose_turn_is_it} no move/error. Opponent's turn.")
-                    game.switch_player()
+                    game.pass_turn()
 
                 if game.winner:
                     ui.state = XOShiftUI.STATE_GAME_OVER
@@ -340,17 +346,14 @@ def main_loop():
         except Exception as e:
             print(f"Error saving game history (on quit) to {filepath}: {e}")
 
+    _close_agents(agent1, agent2)
     pygame.quit()
     sys.exit()
 
 def _apply_replay_moves_to_index(game_instance: XOShiftGame, moves: List[Dict[str, Any]],
                                  target_move_count: int):
     # Reset the game board to a clean state
-    board_size = game_instance.size
-    game_instance.board = [[game_instance.EMPTY for _ in range(board_size)] for _ in range(board_size)]
-    game_instance.winner = None
-    game_instance.winning_line_coords = None
-    game_instance.current_player_index = 0
+    game_instance.reset()
 
     # Apply moves one by one up to the target index
     for i in range(target_move_count):
@@ -0,0 +1,221 @@
+import math
+import random
+import time
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from bitboard import BitboardTables, apply_move_masks, find_winner, get_tables, get_valid_moves_masks, pack_board
+from board_tables import Move
+from time_manager import TimeManager
+
+Board = List[List[Optional[str]]]
+
+# Rollouts longer than this many plies are scored as draws
+ROLLOUT_LIMIT = 80
+DRAW_REWARD = 0.5
+
+
+class MCTSNode:
+    """
+    One position in the search tree.
+
+    wins counts rollout results from the point of view of the player who made
+    `move` (the opponent of player_index, the side to move here); a draw
+    counts half.
+    """
+    __slots__ = ('x_mask', 'o_mask', 'player_index', 'move', 'parent', 'children',
+                 'untried', 'visits', 'wins', 'winner', 'terminal')
+
+    def __init__(self, x_mask: int, o_mask: int, player_index: int, tables: BitboardTables,
+                 rng: random.Random, move: Optional[Move] = None, parent: Optional["MCTSNode"] = None):
+        self.x_mask = x_mask
+        self.o_mask = o_mask
+        self.player_index = player_index
+        self.move = move
+        self.parent = parent
+        self.children: List["MCTSNode"] = []
+        self.visits = 0
+        self.wins = 0.0
+        self.winner = find_winner(x_mask, o_mask, tables)
+        if self.winner is None:
+            self.untried = get_valid_moves_masks(x_mask, o_mask, player_index, tables)
+            rng.shuffle(self.untried)
+        else:
+            self.untried = []
+        # No winner and no legal move (can only happen on tiny boards) is scored as a draw
+        self.terminal = self.winner is not None or not self.untried
+
+    def child_for(self, x_mask: int, o_mask: int, player_index: int) -> Optional["MCTSNode"]:
+        for child in self.children:
+            if child.x_mask == x_mask and child.o_mask == o_mask and child.player_index == player_index:
+                return child
+        return None
+
+
+class MCTS:
+    """
+    UCT Monte Carlo tree search over bitboards.
+
+    Rollouts play random moves with bitboard.py's apply_move_masks and
+    winner masks: a random selectable rim source, then a random target for
+    it. search() runs until the time budget runs out (the clock is read every
+    few playouts, see TimeManager) or max_playouts, and returns the most
+    visited root move.
+    The tree below the chosen move is kept, so the next search() can start
+    from the opponent's reply if it is already in the tree.
+    """
+
+    def __init__(self, exploration: float = math.sqrt(2), time_reserve: float = 0.0,
+                 max_playouts: Optional[int] = None, seed: Optional[int] = None):
+        self.exploration = exploration
+        self.time_reserve = time_reserve
+        self.max_playouts = max_playouts
+        self.rng = random.Random(seed)
+        self.root: Optional[MCTSNode] = None
+        self.root_size = 0
+        self.playouts = 0
+        self.reused_visits = 0
+        self.timer: Optional[TimeManager] = None
+
+    def search(self, board: Board, player_symbol: str, time_budget: float,
+               start_time: Optional[float] = None) -> Optional[Move]:
+        """
+        Returns the most visited move for `player_symbol`, or None if it has no legal move.
+        """
+        size = len(board)
+        tables = get_tables(size)
+        x_mask, o_mask = pack_board(board)
+        player_index = 0 if player_symbol == 'X' else 1
+        self.timer = timer = TimeManager(time_budget, self.time_reserve, start_time)
+
+        root = self._reuse_root(x_mask, o_mask, player_index) if self.root_size == size else None
+        if root is None:
+            root = MCTSNode(x_mask, o_mask, player_index, tables, self.rng)
+        self.root = root
+        self.root_size = size
+        self.reused_visits = root.visits
+        if not root.children and not root.untried:
+            return None
+
+        self.playouts = 0
+        next_check = 1
+        while self.max_playouts is None or self.playouts < self.max_playouts:
+            self._playout(root, tables)
+            self.playouts += 1
+            if self.playouts >= next_check:
+                if timer.expired(self.playouts):
+                    break
+                next_check = self.playouts + timer.check_interval
+
+        best = max(root.children, key=lambda child: child.visits)
+        # Keep the chosen subtree for the next move
+        best.parent = None
+        self.root = best
+        return best.move
+
+    def _reuse_root(self, x_mask: int, o_mask: int, player_index: int) -> Optional[MCTSNode]:
+        """
+        Finds the current position among the replies below the last chosen move.
+        """
+        previous = self.root
+        if previous is None:
+            return None
+        if previous.x_mask == x_mask and previous.o_mask == o_mask and previous.player_index == player_index:
+            return previous
+        node = previous.child_for(x_mask, o_mask, player_index)
+        if node is not None:
+            node.parent = None
+        return node
+
+    def _playout(self, root: MCTSNode, tables: BitboardTables) -> None:
+        node = root
+        # Selection
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            exploration = self.exploration
+            node = max(node.children,
+                       key=lambda c: c.wins / c.visits + exploration * math.sqrt(log_visits / c.visits))
+        # Expansion
+        if node.untried:
+            move = node.untried.pop()
+            x_mask, o_mask = apply_move_masks(node.x_mask, node.o_mask, move, node.player_index, tables)
+            child = MCTSNode(x_mask, o_mask, 1 - node.player_index, tables, self.rng, move, node)
+            node.children.append(child)
+            node = child
+        # Simulation
+        if node.terminal:
+            winner = node.winner
+        else:
+            winner = rollout(node.x_mask, node.o_mask, node.player_index, tables, self.rng)
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += DRAW_REWARD
+            elif winner != node.player_index:
+                node.wins += 1.0
+            node = node.parent
+
+
+def rollout(x_mask: int, o_mask: int, player_index: int, tables: BitboardTables,
+            rng: random.Random, limit: int = ROLLOUT_LIMIT) -> Optional[int]:
+    """
+    Plays random moves from the position and returns the winner's index, or
+    None for a draw (move limit reached, or a side with no legal move).
+    """
+    rim_bits = _rim_bits(tables.size)
+    moves_by_source = tables.moves_by_source
+    line_masks = [line for line, _ in tables.line_masks]
+    choice = rng.choice
+    for _ in range(limit):
+        occupied = x_mask | o_mask
+        sources = [bit for bit in rim_bits if not occupied & bit]
+        if not sources:
+            own = x_mask if player_index == 0 else o_mask
+            sources = [bit for bit in rim_bits if own & bit]
+            if not sources:
+                return None
+        move = choice(moves_by_source[choice(sources)])
+        x_mask, o_mask = apply_move_masks(x_mask, o_mask, move, player_index, tables)
+        # Same double-line rule as find_winner: X is checked first
+        for line in line_masks:
+            if x_mask & line == line:
+                return 0
+        for line in line_masks:
+            if o_mask & line == line:
+                return 1
+        player_index = 1 - player_index
+    return None
+
+
+@lru_cache(maxsize=None)
+def _rim_bits(size: int) -> Tuple[int, ...]:
+    rim_mask = get_tables(size).rim_mask
+    return tuple(1 << i for i in range(size * size) if rim_mask >> i & 1)
+
+
+def benchmark(seconds: float = 2.0, seed: int = 0) -> None:
+    """
+    Prints rollout throughput (random playouts from the empty board) and full
+    MCTS playouts per second for every board size.
+    """
+    rng = random.Random(seed)
+    for size in range(3, 6):
+        tables = get_tables(size)
+        rollouts = 0
+        start = time.monotonic()
+        while time.monotonic() - start < seconds:
+            for _ in range(100):
+                rollout(0, 0, 0, tables, rng)
+            rollouts += 100
+        rollout_rate = rollouts / (time.monotonic() - start)
+
+        engine = MCTS(seed=seed)
+        board: Board = [[None] * size for _ in range(size)]
+        engine.search(board, 'X', time_budget=seconds)
+        search_rate = engine.playouts / seconds
+        print(f"{size}x{size}: {rollout_rate:,.0f} rollouts/s, {search_rate:,.0f} MCTS playouts/s")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,30 @@
+from mcts import MCTS
+import time
+from typing import List, Optional, Tuple
+
+# Configurable parameters
+# The harness passes its per-move limit as time_budget; this is used when it does not
+DEFAULT_TIME_BUDGET = 2.0
+TIME_RESERVE = 0.1  # seconds kept back for process start-up and returning the move
+EXPLORATION = 1.4  # UCT exploration constant
+REPORT_SEARCH_STATS = False
+
+# Ask the harness for its time budget (see agent_loader.TIME_BUDGET_FLAG)
+ACCEPTS_TIME_BUDGET = True
+
+# Kept for as long as this process lives, so the tree below our last move is reused
+_engine: Optional[MCTS] = None
+
+def agent_move(board: List[List[Optional[str]]], player_symbol: str,
+               time_budget: float = DEFAULT_TIME_BUDGET) -> Tuple[int, int, int, int]:
+    start_time = time.monotonic()
+    global _engine
+    if _engine is None:
+        _engine = MCTS(exploration=EXPLORATION, time_reserve=TIME_RESERVE)
+
+    best_move = _engine.search(board, player_symbol, time_budget, start_time)
+    if REPORT_SEARCH_STATS:
+        print(f"MCTS {player_symbol}: {_engine.playouts} playouts "
+              f"({_engine.playouts / max(_engine.timer.elapsed(), 1e-9):,.0f}/s), "
+              f"{_engine.reused_visits} visits reused from the previous move")
+    return best_move if best_move else (0, 0, 0, 0)
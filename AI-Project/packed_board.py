@@ -0,0 +1,125 @@
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from board_tables import Move, get_line_coords, get_rim_cells, get_source_targets
+
+Board = List[List[Optional[str]]]
+
+SYMBOLS = (None, 'X', 'O')
+_CODES = {None: 0, 'X': 1, 'O': 2}
+_PLAYER_BYTES = {'X': b'\x01', 'O': b'\x02'}
+
+
+@lru_cache(maxsize=None)
+def _move_permutations(size: int) -> Dict[Move, itemgetter]:
+    """
+    For every legal move, a getter that picks the child's cells out of
+    `cells + player_byte`: unchanged cells map to themselves, shifted cells to
+    their neighbour towards the target, and the target to the appended byte.
+    """
+    placed = size * size
+    getters: Dict[Move, itemgetter] = {}
+    for (sr, sc), targets in get_source_targets(size).items():
+        for tr, tc in targets:
+            perm = list(range(placed))
+            if sr == tr:
+                step = 1 if tc > sc else -1
+                for c in range(sc, tc, step):
+                    perm[sr * size + c] = sr * size + c + step
+            else:
+                step = 1 if tr > sr else -1
+                for r in range(sr, tr, step):
+                    perm[r * size + sc] = (r + step) * size + sc
+            perm[tr * size + tc] = placed
+            getters[(sr, sc, tr, tc)] = itemgetter(*perm)
+    return getters
+
+
+@lru_cache(maxsize=None)
+def _flat_tables(size: int) -> Tuple[Tuple[int, ...], Tuple[Tuple[int, ...], ...]]:
+    rim = tuple(r * size + c for r, c in get_rim_cells(size))
+    lines = tuple(tuple(r * size + c for r, c in coords) for coords in get_line_coords(size))
+    return rim, lines
+
+
+class PackedBoard:
+    """
+    Immutable board stored as one byte per cell (0 empty, 1 X, 2 O), row-major.
+
+    Hashing, equality and cell access are O(1)-ish on a 9-25 byte string, and
+    apply_move builds the child through a precomputed cell permutation.
+    """
+    __slots__ = ('size', 'cells', '_hash')
+
+    def __init__(self, size: int, cells: bytes):
+        object.__setattr__(self, 'size', size)
+        object.__setattr__(self, 'cells', cells)
+        object.__setattr__(self, '_hash', hash(cells))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PackedBoard is immutable")
+
+    def __reduce__(self):
+        return PackedBoard, (self.size, self.cells)
+
+    @classmethod
+    def from_lists(cls, board: Board) -> "PackedBoard":
+        return cls(len(board), bytes(_CODES[cell] for row in board for cell in row))
+
+    def to_lists(self) -> Board:
+        size = self.size
+        return [[SYMBOLS[code] for code in self.cells[r * size:(r + 1) * size]] for r in range(size)]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, cell: Tuple[int, int]) -> Optional[str]:
+        row, col = cell
+        return SYMBOLS[self.cells[row * self.size + col]]
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PackedBoard):
+            return NotImplemented
+        return self._hash == other._hash and self.cells == other.cells
+
+    def __repr__(self) -> str:
+        return f"PackedBoard({self.size}, {self.cells!r})"
+
+    def apply_move(self, move: Move, player_symbol: str) -> "PackedBoard":
+        """
+        Returns the child position after a (pre-validated) move.
+        """
+        getter = _move_permutations(self.size)[move]
+        return PackedBoard(self.size, bytes(getter(self.cells + _PLAYER_BYTES[player_symbol])))
+
+    def get_all_valid_moves(self, player_symbol: str) -> List[Move]:
+        """
+        Same moves, in the same order, as agent_utils.get_all_valid_moves.
+        """
+        size = self.size
+        cells = self.cells
+        rim, _ = _flat_tables(size)
+        sources = [i for i in rim if cells[i] == 0]
+        if not sources:
+            code = _CODES[player_symbol]
+            sources = [i for i in rim if cells[i] == code]
+        source_targets = get_source_targets(size)
+        return [(i // size, i % size, tr, tc)
+                for i in sources
+                for tr, tc in source_targets[(i // size, i % size)]]
+
+    def winner(self) -> Optional[str]:
+        """
+        The winning symbol under XOShiftGame.check_winner's rules, or None.
+        """
+        cells = self.cells
+        _, lines = _flat_tables(self.size)
+        for code in (1, 2):
+            for line in lines:
+                if all(cells[i] == code for i in line):
+                    return SYMBOLS[code]
+        return None
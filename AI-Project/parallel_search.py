@@ -0,0 +1,245 @@
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing.connection import Connection
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from search import INFINITY, Board, Move, NegamaxSearch
+
+# Builds one configured NegamaxSearch; must be picklable (a module-level function)
+SearchFactory = Callable[[], NegamaxSearch]
+
+# How long the coordinator waits past the budget before giving up on a helper
+RESULT_GRACE = 0.25
+# How often idle helpers check that the process that started them still exists
+PARENT_CHECK_INTERVAL = 0.5
+SHUTDOWN_TIMEOUT = 0.5
+
+
+def _helper_main(make_search: SearchFactory, conn: Connection) -> None:
+    """
+    Body of a helper process: keeps one NegamaxSearch (and its transposition
+    table) for its whole life and answers
+    (board, player_symbol, root_moves, max_depth, time_budget, position_history)
+    requests with (iteration_results, nodes) until it receives None or its
+    parent dies.
+    """
+    search = make_search()
+    parent = multiprocessing.parent_process()
+    while True:
+        if not conn.poll(PARENT_CHECK_INTERVAL):
+            if parent is not None and not parent.is_alive():
+                break
+            continue
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        board, player_symbol, root_moves, max_depth, time_budget, position_history = request
+        search.max_depth = max_depth
+        search.search(board, player_symbol, root_moves=root_moves, time_budget=time_budget,
+                      position_history=position_history)
+        try:
+            conn.send((search.iteration_results, search.nodes))
+        except (OSError, ValueError):
+            break
+
+
+class RootParallelSearch:
+    """
+    Root-parallel iterative deepening over a pool of pre-started helper processes.
+
+    The first iteration (static ranking and the root beam) runs in-process on
+    local_search. The surviving root moves are then dealt round-robin to the
+    helpers. Each helper runs its own NegamaxSearch on its share, and the
+    shares are compared at the deepest iteration every helper completed. Ties
+    go to the move ranked first by the static iteration. Shares whose helper
+    completed no iteration are left out (and timed_out is set); if that is
+    every share, the move from the static iteration is returned.
+
+    With workers=1 no helper is started and search() is exactly
+    local_search.search(), so single-worker play stays deterministic and
+    identical to the serial engine.
+
+    Helpers are daemon processes, so the process that owns this object must
+    not be a daemon itself (agent_runner's workers are not). Helpers exit
+    when close() is called or when their parent process disappears.
+    """
+
+    def __init__(self, make_search: SearchFactory, workers: int = 1,
+                 local_search: Optional[NegamaxSearch] = None):
+        if workers < 1:
+            raise ValueError("RootParallelSearch needs at least one worker.")
+        self.make_search = make_search
+        self.workers = workers
+        self.local_search = local_search if local_search is not None else make_search()
+        self._helpers: List[Tuple[multiprocessing.Process, Connection]] = []
+
+        self.best_score = -INFINITY
+        self.completed_depth = 0
+        self.nodes = 0
+        self.root_candidates: List[Move] = []
+        self.timed_out = False
+
+    def start(self) -> None:
+        """
+        Starts the helper pool (once), so the first move does not pay for it.
+        """
+        while self.workers > 1 and len(self._helpers) < self.workers:
+            self._helpers.append(self._spawn_helper())
+
+    def close(self) -> None:
+        for process, conn in self._helpers:
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for index in range(len(self._helpers)):
+            self._stop_helper(index)
+        self._helpers = []
+
+    def search(self, board: Board, player_symbol: str, start_time: Optional[float] = None,
+               root_moves: Optional[List[Move]] = None, time_budget: Optional[float] = None,
+               position_history: Optional[Dict[int, int]] = None) -> Optional[Move]:
+        local = self.local_search
+        if self.workers == 1:
+            best_move = local.search(board, player_symbol, start_time, root_moves, time_budget,
+                                     position_history=position_history)
+            self._copy_stats(local.best_score, local.completed_depth, local.nodes,
+                             local.root_candidates, local.timed_out)
+            return best_move
+
+        self.start()
+        start_time = time.monotonic() if start_time is None else start_time
+        budget = local.time_limit if time_budget is None else time_budget
+        max_depth = local.max_depth
+
+        local.max_depth = 1
+        try:
+            best_move = local.search(board, player_symbol, start_time, root_moves, time_budget,
+                                     position_history=position_history)
+        finally:
+            local.max_depth = max_depth
+        candidates = list(local.root_candidates)
+        self._copy_stats(local.best_score, local.completed_depth, local.nodes, candidates, local.timed_out)
+        if best_move is None or max_depth <= 1 or len(candidates) <= 1 or local.timed_out:
+            return best_move
+
+        shares = [candidates[i::self.workers] for i in range(self.workers)]
+        shares = [share for share in shares if share]
+        remaining = budget - (time.monotonic() - start_time)
+        for (_, conn), share in zip(self._helpers, shares):
+            conn.send(([row[:] for row in board], player_symbol, share, max_depth, remaining, position_history))
+
+        results = []
+        for index, share in enumerate(shares):
+            conn = self._helpers[index][1]
+            wait = max(0.0, start_time + budget - time.monotonic()) + RESULT_GRACE
+            try:
+                if conn.poll(wait):
+                    results.append(conn.recv())
+                    continue
+            except (EOFError, OSError):
+                pass
+            # A helper that missed the deadline or died is replaced; its share is lost for this move
+            self._stop_helper(index)
+            self._helpers[index] = self._spawn_helper()
+        if len(results) < len(shares):
+            self.timed_out = True
+            return best_move
+
+        nodes = self.nodes + sum(nodes for _, nodes in results)
+        # A helper whose budget ran out before its first iteration (e.g. the
+        # remaining time was within its time_reserve) has nothing to compare
+        completed = [iterations for iterations, _ in results if iterations]
+        if not completed:
+            self._copy_stats(self.best_score, self.completed_depth, nodes, candidates, True)
+            return best_move
+
+        depth = min(len(iterations) for iterations in completed)
+        rank = {move: i for i, move in enumerate(candidates)}
+        best = max((iterations[depth - 1] for iterations in completed),
+                   key=lambda result: (result[1], -rank[result[0]]))
+        self._copy_stats(best[1], depth, nodes, candidates,
+                         depth < max_depth or len(completed) < len(results))
+        return best[0]
+
+    def _copy_stats(self, best_score: float, completed_depth: int, nodes: int,
+                    root_candidates: List[Move], timed_out: bool) -> None:
+        self.best_score = best_score
+        self.completed_depth = completed_depth
+        self.nodes = nodes
+        self.root_candidates = root_candidates
+        self.timed_out = timed_out
+
+    def _spawn_helper(self) -> Tuple[multiprocessing.Process, Connection]:
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_helper_main, args=(self.make_search, child_conn), daemon=True)
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def _stop_helper(self, index: int) -> None:
+        process, conn = self._helpers[index]
+        process.join(timeout=SHUTDOWN_TIMEOUT)
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout=SHUTDOWN_TIMEOUT)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        conn.close()
+
+
+def benchmark(make_search: SearchFactory, worker_counts: Sequence[int] = (1, 2, 4, 8), size: int = 5,
+              positions: int = 6, fixed_depth: int = 5, time_budget: float = 2.0, seed: int = 0) -> None:
+    """
+    For each worker count, prints the speedup of a fixed-depth search over one
+    worker and the average depth completed within time_budget.
+    """
+    from agent_utils import get_all_valid_moves
+    from game import XOShiftGame
+
+    rng = random.Random(seed)
+    boards = []
+    game = XOShiftGame(size)
+    while len(boards) < positions:
+        for _ in range(rng.randint(2, 12)):
+            symbol = game.current_player
+            game.apply_move(*rng.choice(get_all_valid_moves(game.board, symbol)), symbol)
+            if game.winner:
+                game.reset()
+            else:
+                game.switch_player()
+        boards.append(([row[:] for row in game.board], game.current_player))
+
+    print(f"{os.cpu_count()} CPU(s), {size}x{size}, {positions} positions")
+    serial_seconds = None
+    for workers in worker_counts:
+        parallel = RootParallelSearch(make_search, workers)
+        parallel.start()
+        parallel.local_search.max_depth = fixed_depth
+        start = time.monotonic()
+        for board, symbol in boards:
+            parallel.search(board, symbol, time_budget=1000.0)
+        seconds = time.monotonic() - start
+
+        parallel.local_search.max_depth = 64
+        depths = []
+        for board, symbol in boards:
+            parallel.search(board, symbol, time_budget=time_budget)
+            depths.append(parallel.completed_depth)
+        parallel.close()
+
+        serial_seconds = seconds if serial_seconds is None else serial_seconds
+        print(f"{workers} worker(s): depth {fixed_depth} in {seconds / positions:.2f}s/position "
+              f"(speedup {serial_seconds / seconds:.2f}x), "
+              f"average depth in {time_budget:.1f}s: {sum(depths) / len(depths):.1f}")
+
+
+if __name__ == "__main__":
+    from your_agent import make_search
+    benchmark(make_search)
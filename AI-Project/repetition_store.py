@@ -0,0 +1,127 @@
+import json
+import os
+import random
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+Move = Tuple[int, int, int, int]
+# (position hash, move played there)
+Entry = Tuple[int, Move]
+
+
+class RepetitionStore:
+    """
+    Remembers the last `capacity` (position hash, move) pairs an agent played.
+
+    Entries live in a bounded deque (the oldest falls out on append) and a
+    count per entry, so recording and membership tests are O(1). The store
+    is kept in memory for as long as the agent process lives.
+
+    With a path, the entries are loaded from it on creation and save() writes
+    them back on a background thread: the snapshot is dumped to a temporary
+    file in the same directory and moved over the old file with os.replace, so
+    readers (or a second process using the same path) never see a partial
+    file. Saving never blocks the caller: it only takes a snapshot, and a
+    snapshot taken while a write is running is written right after it.
+    """
+
+    def __init__(self, capacity: int, path: Optional[str] = None):
+        if capacity < 1:
+            raise ValueError("A repetition store needs room for at least one entry.")
+        self.capacity = capacity
+        self.path = path
+        self._entries: Deque[Entry] = deque(maxlen=capacity)
+        self._counts: Dict[Entry, int] = {}
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._snapshot: Optional[list] = None
+        if path is not None:
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, entry: Entry) -> bool:
+        return entry in self._counts
+
+    def record(self, position_hash: int, move: Move) -> None:
+        entries, counts = self._entries, self._counts
+        if len(entries) == self.capacity:
+            oldest = entries[0]
+            if counts[oldest] == 1:
+                del counts[oldest]
+            else:
+                counts[oldest] -= 1
+        entry = (position_hash, tuple(move))
+        entries.append(entry)
+        counts[entry] = counts.get(entry, 0) + 1
+
+    def choose(self, position_hash: int, best_move: Move, candidates: Sequence[Move],
+               rng: Optional[random.Random] = None) -> Move:
+        """
+        Returns best_move unless it was already played in this position; then
+        the first candidate not played there yet, or a random candidate if
+        all were. The returned move is recorded.
+        """
+        move = best_move
+        if (position_hash, tuple(best_move)) in self._counts:
+            unplayed = [m for m in candidates if (position_hash, tuple(m)) not in self._counts]
+            if unplayed:
+                move = unplayed[0]
+            elif candidates:
+                move = (rng or random).choice(list(candidates))
+        self.record(position_hash, move)
+        return move
+
+    def save(self) -> None:
+        """
+        Writes the entries to `path` in the background (does nothing without a path).
+        """
+        if self.path is None:
+            return
+        with self._lock:
+            self._snapshot = [[position_hash, list(move)] for position_hash, move in self._entries]
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits for a background save to finish.
+        """
+        writer = self._writer
+        if writer is not None:
+            writer.join(timeout)
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._lock:
+                snapshot, self._snapshot = self._snapshot, None
+                if snapshot is None:
+                    self._writer = None
+                    return
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, "w") as f:
+                    json.dump(snapshot, f)
+                os.replace(temp_path, self.path)
+            except OSError:
+                pass  # persistence is best effort; the in-memory store is unaffected
+
+    def _load(self, path: str) -> None:
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(saved, list):
+            return
+        for item in saved[-self.capacity:]:
+            # Anything else (e.g. the old board-string format) is skipped
+            if (isinstance(item, list) and len(item) == 2 and isinstance(item[0], int)
+                    and isinstance(item[1], list) and len(item[1]) == 4):
+                self.record(item[0], tuple(item[1]))
+
+    def entries(self) -> List[Entry]:
+        return list(self._entries)
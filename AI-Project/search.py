@@ -0,0 +1,506 @@
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agent_utils import get_distinct_moves, lookup_valid_moves
+from board_tables import get_line_coords, get_touched_lines
+from game import XOShiftGame
+from time_manager import TimeManager
+from transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+Board = List[List[Optional[str]]]
+Move = Tuple[int, int, int, int]
+# evaluate(board, symbol) -> score from `symbol`'s point of view (positive is good for it)
+Evaluator = Callable[[Board, str], float]
+# order_moves(search, moves, side, tt_move, ply) -> the moves, best first for `side`
+MoveOrderer = Callable[["NegamaxSearch", List[Move], str, Optional[Move], int], List[Move]]
+
+INFINITY = float('inf')
+KILLERS_PER_PLY = 2
+# Failed aspiration windows are widened this many times before falling back to a full window
+ASPIRATION_RETRIES = 2
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def opponent_of(player_symbol: str) -> str:
+    return 'O' if player_symbol == 'X' else 'X'
+
+
+def order_by_evaluation(search: "NegamaxSearch", moves: List[Move], side: str,
+                        tt_move: Optional[Move], ply: int) -> List[Move]:
+    """
+    Orders moves by the static evaluation of each child, best for `side` first.
+
+    This is the ordering the minimax agents used for their beams, done with
+    make/unmake on the search board instead of a deep copy per child.
+    """
+    board = search.game.board
+    scored = []
+    for move in moves:
+        search.make_move(move)
+        scored.append((search.evaluate(board, side), move))
+        search.unmake_move()
+    scored.sort(reverse=True, key=lambda x: x[0])
+    return [m for (_, m) in scored]
+
+
+def order_by_heuristics(search: "NegamaxSearch", moves: List[Move], side: str,
+                        tt_move: Optional[Move], ply: int) -> List[Move]:
+    """
+    Cheap dynamic ordering that never calls the evaluator.
+
+    Moves are ranked in classes: immediate wins for `side`, blocks (moves that
+    shift a line where the opponent is one piece short), killer moves of this
+    ply, then everything else. Within a class, moves with a higher history
+    score come first; moves that complete a line for the opponent go last.
+    The engine itself puts the transposition-table move in front.
+    """
+    game = search.game
+    board = game.board
+    size = game.size
+    opponent = opponent_of(side)
+    threats = set()
+    for index, coords in enumerate(get_line_coords(size)):
+        if sum(1 for r, c in coords if board[r][c] == opponent) == size - 1:
+            threats.add(index)
+    touched = get_touched_lines(size)
+    killers = search.killers[ply] if ply < len(search.killers) else ()
+    history = search.history
+
+    keyed = []
+    for index, move in enumerate(moves):
+        game.make_move(*move)
+        winner = game.winner
+        game.unmake_move()
+        if winner == side:
+            rank = 0
+        elif winner is not None:
+            rank = 4
+        elif threats and not threats.isdisjoint(touched[move]):
+            rank = 1
+        elif move in killers:
+            rank = 2
+        else:
+            rank = 3
+        keyed.append((rank, -history.get(move, 0), index, move))
+    keyed.sort()
+    return [m for (_, _, _, m) in keyed]
+
+
+class NegamaxSearch:
+    """
+    Iterative-deepening principal variation search (negamax with alpha-beta)
+    on a single XOShiftGame.
+
+    The search walks the tree with XOShiftGame.make_move/unmake_move, so no
+    board is copied per node. Agents configure it with:
+      evaluate: static evaluation, called as evaluate(board, side). An
+          incremental evaluator (one with load/push/pop methods, such as
+          incremental_eval.LineCodeEvaluator) is loaded with the root board
+          and pushed/popped along with every make/unmake (see make_move), so
+          it scores leaves from state it keeps up to date.
+      max_depth / time_limit: iterative deepening bounds. time_limit is the
+          default budget (seconds from start_time on time.monotonic) when the
+          caller passes no time_budget; time_reserve is kept back from either.
+          The clock is read every few nodes by a TimeManager, which also skips
+          an iteration that is predicted not to finish in time.
+      depth_discount: leaf scores are multiplied by depth_discount ** ply, as the
+          old minimax agents did, to prefer quicker wins.
+      beam_width: if set, only the first beam_width ordered moves are searched
+          at interior nodes.
+      root_beam_width: if set, only the best root_beam_width root moves of one
+          iteration are searched in the next, and root moves get an open window
+          so their scores can be ranked. Otherwise every iteration searches the
+          root moves in their original order, and moves after the first only
+          have to be proven no better than the current best (null window).
+      aspiration_window: if set, root moves searched with an open window start
+          from a window of +/- aspiration_window (in evaluation units, scaled
+          by the depth discount) around their score from the previous
+          iteration, widening it when the search falls outside.
+      order_moves: MoveOrderer hook; the transposition-table move is always
+          tried first when it is among the searched moves. Beta cutoffs update
+          the killers (per ply) and history (per move) tables the hook may read.
+          The previous iteration's principal variation is always searched first.
+      transposition_table: optional TranspositionTable shared across searches.
+      distinct_moves: expand one move per distinct child position.
+      repetition_limit: if set, a position below the root that has occurred
+          this many times (counting the game's position_history passed to
+          search() and the current search path) is scored as a draw (0),
+          matching a game loop that declares such repetitions drawn.
+    """
+
+    def __init__(self, evaluate: Evaluator, max_depth: int = 4, time_limit: float = 1.9,
+                 depth_discount: float = 1.0, beam_width: Optional[int] = None,
+                 root_beam_width: Optional[int] = None, order_moves: Optional[MoveOrderer] = None,
+                 transposition_table: Optional[TranspositionTable] = None, distinct_moves: bool = True,
+                 aspiration_window: Optional[float] = None, time_reserve: float = 0.0,
+                 repetition_limit: Optional[int] = None):
+        self.evaluate = evaluate
+        self._incremental = evaluate if hasattr(evaluate, "push") else None
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.depth_discount = depth_discount
+        self.beam_width = beam_width
+        self.root_beam_width = root_beam_width
+        self.order_moves = order_moves
+        self.transposition_table = transposition_table
+        self.distinct_moves = distinct_moves
+        self.aspiration_window = aspiration_window
+        self.time_reserve = time_reserve
+        self.repetition_limit = repetition_limit
+
+        self.game: Optional[XOShiftGame] = None
+        self._stop: Optional[Callable[[], bool]] = None
+        self.timer: Optional[TimeManager] = None
+        self.deadline = 0.0
+        self._next_check = 0
+        self.nodes = 0
+        self.best_score = -INFINITY
+        self.completed_depth = 0
+        # (best move, best score) of every completed iteration, shallowest first
+        self.iteration_results: List[Tuple[Move, float]] = []
+        self.root_candidates: List[Move] = []
+        self.timed_out = False
+        self.partial_iteration = False
+        self.killers: List[List[Move]] = []
+        self.history: Dict[Move, int] = {}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.researches = 0
+        self.principal_variation: List[Move] = []
+        self._pv_lines: List[List[Move]] = []
+        self._follow_pv = False
+        # position_hash -> occurrences in the game plus on the current search path
+        self._repetitions: Optional[Dict[int, int]] = None
+
+    def make_move(self, move: Move) -> None:
+        """
+        Plays `move` for the side to move on the search board (and on an incremental evaluator).
+        """
+        game = self.game
+        if self._incremental is not None:
+            self._incremental.push(game.board, move, game.current_player)
+        game.make_move(*move)
+        repetitions = self._repetitions
+        if repetitions is not None:
+            key = game.position_hash
+            repetitions[key] = repetitions.get(key, 0) + 1
+
+    def unmake_move(self) -> None:
+        game = self.game
+        if self._repetitions is not None:
+            self._repetitions[game.position_hash] -= 1
+        game.unmake_move()
+        if self._incremental is not None:
+            self._incremental.pop()
+
+    def _is_repetition_draw(self) -> bool:
+        repetitions = self._repetitions
+        game = self.game
+        return (repetitions is not None and not game.winner
+                and repetitions[game.position_hash] >= self.repetition_limit)
+
+    def generate_moves(self, side: str) -> List[Move]:
+        if self.distinct_moves:
+            return get_distinct_moves(self.game.board, side)
+        return list(lookup_valid_moves(self.game.board, side))
+
+    def search(self, board: Board, player_symbol: str, start_time: Optional[float] = None,
+               root_moves: Optional[List[Move]] = None, time_budget: Optional[float] = None,
+               stop: Optional[Callable[[], bool]] = None,
+               position_history: Optional[Dict[int, int]] = None) -> Optional[Move]:
+        """
+        Searches `board` for `player_symbol` until max_depth, the deadline, or
+        until `stop` (polled along with the clock) returns True.
+        position_history ({position_hash: times seen}, e.g.
+        XOShiftGame.position_counts) is only used with repetition_limit.
+
+        Returns the best move of the last completed iteration, or of the
+        interrupted one if its best move was fully searched and the previous
+        best move (always searched first) was among those searched (None if
+        there is no legal move). Afterwards best_score, completed_depth,
+        iteration_results, partial_iteration, root_candidates, nodes, cutoffs,
+        first_move_cutoffs, researches (failed null or aspiration windows),
+        principal_variation, timer and timed_out describe the search.
+        """
+        budget = self.time_limit if time_budget is None else time_budget
+        self.timer = TimeManager(budget, self.time_reserve, start_time)
+        self.deadline = self.timer.deadline
+        self._next_check = 0
+        self._stop = stop
+        self.nodes = 0
+        self.best_score = -INFINITY
+        self.completed_depth = 0
+        self.iteration_results = []
+        self.timed_out = False
+        self.partial_iteration = False
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.researches = 0
+        self.principal_variation = []
+        # Killers are position-specific; history is only aged so it carries over between moves
+        self.killers = []
+        self.history = {move: value >> 1 for move, value in self.history.items() if value > 1}
+
+        self.game = XOShiftGame(len(board))
+        self.game.load_board(board, XOShiftGame.PLAYERS.index(player_symbol))
+        if self._incremental is not None:
+            self._incremental.load(board)
+        if self.repetition_limit:
+            self._repetitions = dict(position_history) if position_history else {}
+            root_key = self.game.position_hash
+            self._repetitions[root_key] = max(self._repetitions.get(root_key, 0), 1)
+        else:
+            self._repetitions = None
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+
+        candidates = list(root_moves) if root_moves is not None else self.generate_moves(player_symbol)
+        self.root_candidates = candidates
+        if not candidates:
+            return None
+        best_move = candidates[0]
+        opponent = opponent_of(player_symbol)
+
+        timer = self.timer
+        current_best_move = None
+        current_best_score = -INFINITY
+        current_pv: List[Move] = []
+        try:
+            previous_scores = {}
+            for depth in range(1, self.max_depth + 1):
+                if depth > 1 and not timer.can_start_iteration():
+                    break
+                timer.start_iteration()
+                if candidates[0] != best_move:
+                    # Search the previous best first, so an interrupted iteration is still usable
+                    candidates.remove(best_move)
+                    candidates.insert(0, best_move)
+                scored_moves = []
+                current_best_move = None
+                current_best_score = -INFINITY
+                current_pv = []
+                for move in candidates:
+                    self.nodes += 1
+                    if self.nodes >= self._next_check:
+                        self._check_time()
+                    self.make_move(move)
+                    if depth == 1:
+                        # Like the old agents, the first iteration ranks children by raw static score
+                        score = 0.0 if self._is_repetition_draw() else self._static_score(player_symbol)
+                        line = []
+                    else:
+                        on_pv = bool(self.principal_variation) and move == self.principal_variation[0]
+                        if self.root_beam_width is None and current_best_move is not None:
+                            score = self._search_null_window(depth, current_best_score, opponent, on_pv)
+                        else:
+                            score = self._search_aspiration(depth, previous_scores.get(move), opponent, on_pv)
+                        line = self._pv_lines[1]
+                    self.unmake_move()
+                    scored_moves.append((score, move))
+                    if score > current_best_score:
+                        current_best_score = score
+                        current_best_move = move
+                        current_pv = [move] + line
+                best_move = current_best_move
+                self.best_score = current_best_score
+                self.principal_variation = current_pv
+                self.completed_depth = depth
+                self.iteration_results.append((best_move, current_best_score))
+                timer.record_iteration()
+                previous_scores = {m: score for (score, m) in scored_moves}
+                if self.root_beam_width is not None:
+                    scored_moves.sort(reverse=True, key=lambda x: x[0])
+                    candidates = [m for (_, m) in scored_moves[:self.root_beam_width]]
+                    self.root_candidates = candidates
+        except SearchTimeout:
+            # The search board is rebuilt by the next search, so it is not unwound here
+            self.timed_out = True
+            if current_best_move is not None:
+                # The previous best was searched first, so anything that beat it at this depth is better
+                best_move = current_best_move
+                self.best_score = current_best_score
+                self.principal_variation = current_pv
+                self.partial_iteration = True
+        return best_move
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """
+        Share of beta cutoffs produced by the first move searched, a measure of ordering quality.
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def _record_cutoff(self, move: Move, depth: int, ply: int, first: bool) -> None:
+        self.cutoffs += 1
+        if first:
+            self.first_move_cutoffs += 1
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLERS_PER_PLY:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def _search_null_window(self, depth: int, best_score: float, opponent: str, on_pv: bool) -> float:
+        """
+        Searches the root move just made, which only matters if it beats best_score.
+
+        A null window proves most moves no better cheaply; a move that fails
+        high is searched again with an open upper bound to get its real score.
+        """
+        self._follow_pv = on_pv
+        score = -self._negamax(depth - 1, -math.nextafter(best_score, INFINITY), -best_score, 1, opponent)
+        if score > best_score:
+            self.researches += 1
+            self._follow_pv = on_pv
+            score = -self._negamax(depth - 1, -INFINITY, -best_score, 1, opponent)
+        return score
+
+    def _search_aspiration(self, depth: int, previous_score: Optional[float], opponent: str, on_pv: bool) -> float:
+        """
+        Searches the root move just made for its exact score.
+
+        With an aspiration window, the search starts around the move's score
+        from the previous iteration. Leaf scores shrink by one depth discount
+        per iteration, so that score is scaled once before centring the window.
+        """
+        if self.aspiration_window is None or previous_score is None or self.depth_discount == 0:
+            self._follow_pv = on_pv
+            return -self._negamax(depth - 1, -INFINITY, INFINITY, 1, opponent)
+
+        center = previous_score * self.depth_discount
+        delta = self.aspiration_window * self.depth_discount ** depth
+        lower, upper = center - delta, center + delta
+        for attempt in range(ASPIRATION_RETRIES + 1):
+            self._follow_pv = on_pv
+            score = -self._negamax(depth - 1, -upper, -lower, 1, opponent)
+            if lower < score < upper:
+                return score
+            self.researches += 1
+            delta *= 4
+            if score <= lower:
+                lower = score - delta if attempt < ASPIRATION_RETRIES - 1 else -INFINITY
+            else:
+                upper = score + delta if attempt < ASPIRATION_RETRIES - 1 else INFINITY
+        self._follow_pv = on_pv
+        return -self._negamax(depth - 1, -INFINITY, INFINITY, 1, opponent)
+
+    def _static_score(self, side: str) -> float:
+        """
+        Static evaluation of the current position for `side`.
+
+        Decided positions are scored from the actual winner's side, so a double
+        line (won by the first player in PLAYERS) is not misread as a win for `side`.
+        """
+        winner = self.game.winner
+        if winner and winner != side:
+            return -self.evaluate(self.game.board, winner)
+        return self.evaluate(self.game.board, side)
+
+    def _check_time(self) -> None:
+        if self.timer.expired(self.nodes) or (self._stop is not None and self._stop()):
+            raise SearchTimeout()
+        self._next_check = self.nodes + self.timer.check_interval
+
+    def _negamax(self, depth: int, alpha: float, beta: float, ply: int, side: str) -> float:
+        """
+        Returns the (discounted) score of the current position for `side`, the player to move.
+        """
+        self.nodes += 1
+        if self.nodes >= self._next_check:
+            self._check_time()
+
+        pv_lines = self._pv_lines
+        while len(pv_lines) <= ply + 1:
+            pv_lines.append([])
+        pv_lines[ply] = []
+        # Checked before the table, so path-dependent draw scores are never stored
+        if self._repetitions is not None and self._is_repetition_draw():
+            return 0.0
+
+        game = self.game
+        table = self.transposition_table
+        # Stored scores are divided by the ply discount so they can be reused at any ply
+        scale = self.depth_discount ** ply
+        use_table = table is not None and scale != 0
+        key = game.position_hash
+        alpha_orig = alpha
+        tt_move = None
+
+        if use_table:
+            entry = table.probe(key)
+            if entry is not None:
+                tt_depth, tt_bound, tt_score, tt_move = entry
+                if tt_depth >= depth:
+                    score = tt_score * scale
+                    if tt_bound == EXACT:
+                        return score
+                    if tt_bound == LOWER_BOUND:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        return score
+
+        moves = self.generate_moves(side) if depth > 0 and not game.winner else None
+        if not moves:
+            score = self._static_score(side)
+            if use_table:
+                table.store(key, depth, EXACT, score, None)
+            return score * scale
+
+        if self.order_moves is not None:
+            moves = self.order_moves(self, moves, side, tt_move, ply)
+        if self.beam_width is not None:
+            moves = moves[:self.beam_width]
+        if tt_move is not None and tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        if self._follow_pv:
+            # Still on the previous iteration's principal variation: its move goes first
+            pv = self.principal_variation
+            pv_move = pv[ply] if ply < len(pv) else None
+            if pv_move is not None and pv_move in moves:
+                moves.remove(pv_move)
+                moves.insert(0, pv_move)
+            else:
+                self._follow_pv = False
+
+        opponent = opponent_of(side)
+        best_score = -INFINITY
+        best_move = None
+        for index, move in enumerate(moves):
+            self.make_move(move)
+            if index == 0:
+                score = -self._negamax(depth - 1, -beta, -alpha, ply + 1, opponent)
+            else:
+                self._follow_pv = False
+                # Later moves only need to be proven no better than alpha; re-search the ones that are
+                score = -self._negamax(depth - 1, -math.nextafter(alpha, INFINITY), -alpha, ply + 1, opponent)
+                if alpha < score < beta:
+                    self.researches += 1
+                    score = -self._negamax(depth - 1, -beta, -alpha, ply + 1, opponent)
+            self.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    pv_lines[ply] = [move] + pv_lines[ply + 1]
+                    if alpha >= beta:
+                        self._record_cutoff(move, depth, ply, index == 0)
+                        break
+
+        if use_table:
+            if best_score <= alpha_orig:
+                bound = UPPER_BOUND
+            elif best_score >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            table.store(key, depth, bound, best_score / scale, best_move)
+        return best_score
@@ -0,0 +1,198 @@
+import random
+from functools import lru_cache
+from typing import Callable, Hashable, List, Optional, Tuple
+
+from bitboard import pack_board, unpack_board
+
+Board = List[List[Optional[str]]]
+Move = Tuple[int, int, int, int]
+
+# The XOShift rules are invariant under the 8 rotations and reflections of the
+# square (D4): rows and columns map onto rows and columns, the rim onto the rim
+# and the diagonals onto each other. Transforms are numbered
+#   0 identity, 1 rotate 90, 2 rotate 180, 3 rotate 270,
+#   4 mirror left/right, 5 mirror top/bottom, 6 transpose, 7 anti-transpose.
+NUM_TRANSFORMS = 8
+INVERSE_TRANSFORM = (0, 3, 2, 1, 4, 5, 6, 7)
+
+
+def transform_cell(row: int, col: int, transform: int, size: int) -> Tuple[int, int]:
+    """
+    Maps a cell through one of the 8 transforms.
+    """
+    last = size - 1
+    if transform == 0:
+        return row, col
+    if transform == 1:
+        return col, last - row
+    if transform == 2:
+        return last - row, last - col
+    if transform == 3:
+        return last - col, row
+    if transform == 4:
+        return row, last - col
+    if transform == 5:
+        return last - row, col
+    if transform == 6:
+        return col, row
+    return last - col, last - row
+
+
+@lru_cache(maxsize=None)
+def _cell_permutations(size: int) -> Tuple[Tuple[int, ...], ...]:
+    """
+    For every transform, the destination index of each row-major cell index.
+    """
+    return tuple(
+        tuple(r * size + c for r, c in (transform_cell(i // size, i % size, t, size) for i in range(size * size)))
+        for t in range(NUM_TRANSFORMS)
+    )
+
+
+@lru_cache(maxsize=None)
+def _row_mask_tables(size: int) -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    """
+    tables[t][r][pattern] is the transformed bitmask of row r holding `pattern`,
+    so a whole mask is transformed with one lookup per row.
+    """
+    perms = _cell_permutations(size)
+    tables = []
+    for t in range(NUM_TRANSFORMS):
+        per_row = []
+        for r in range(size):
+            row_table = []
+            for pattern in range(1 << size):
+                mask = 0
+                for c in range(size):
+                    if pattern >> c & 1:
+                        mask |= 1 << perms[t][r * size + c]
+                row_table.append(mask)
+            per_row.append(tuple(row_table))
+        tables.append(tuple(per_row))
+    return tuple(tables)
+
+
+def transform_board(board: Board, transform: int) -> Board:
+    """
+    Returns a new list-of-lists board moved through the given transform.
+    """
+    size = len(board)
+    result: Board = [[None] * size for _ in range(size)]
+    for r in range(size):
+        for c in range(size):
+            tr, tc = transform_cell(r, c, transform, size)
+            result[tr][tc] = board[r][c]
+    return result
+
+
+def transform_mask(mask: int, transform: int, size: int) -> int:
+    """
+    Moves a bitboard mask (bit r * size + c per cell) through the given transform.
+    """
+    tables = _row_mask_tables(size)[transform]
+    row_bits = (1 << size) - 1
+    result = 0
+    for r in range(size):
+        result |= tables[r][(mask >> (r * size)) & row_bits]
+    return result
+
+
+def canonicalize(board: Board) -> Tuple[Board, int]:
+    """
+    Maps a list-of-lists board to its canonical representative, the same one
+    canonicalize_masks picks for the packed board.
+
+    Returns:
+        (canonical_board, transform) with canonical_board == transform_board(board, transform).
+    """
+    size = len(board)
+    (x_mask, o_mask), transform = canonicalize_masks(*pack_board(board), size)
+    return unpack_board(x_mask, o_mask, size), transform
+
+
+def canonicalize_masks(x_mask: int, o_mask: int, size: int) -> Tuple[Tuple[int, int], int]:
+    """
+    Maps a packed (x_mask, o_mask) board to its canonical representative.
+
+    Returns:
+        ((canonical_x, canonical_o), transform).
+    """
+    best = (x_mask, o_mask)
+    best_transform = 0
+    for t in range(1, NUM_TRANSFORMS):
+        candidate = (transform_mask(x_mask, t, size), transform_mask(o_mask, t, size))
+        if candidate < best:
+            best = candidate
+            best_transform = t
+    return best, best_transform
+
+
+def transform_move(move: Move, transform: int, size: int) -> Move:
+    """
+    Maps a move on the original board to the equivalent move on the transformed board.
+    """
+    sr, sc = transform_cell(move[0], move[1], transform, size)
+    tr, tc = transform_cell(move[2], move[3], transform, size)
+    return sr, sc, tr, tc
+
+
+def untransform_move(move: Move, transform: int, size: int) -> Move:
+    """
+    Maps a move on the transformed (e.g. canonical) board back to the original board.
+    """
+    return transform_move(move, INVERSE_TRANSFORM[transform], size)
+
+
+def get_board_symmetries(board: Board) -> List[int]:
+    """
+    Lists the transforms (always including the identity) that leave the board unchanged.
+    """
+    return [t for t in range(NUM_TRANSFORMS) if t == 0 or transform_board(board, t) == board]
+
+
+def filter_symmetric_moves(board: Board, moves: List[Move],
+                           key: Optional[Callable[[Move], Hashable]] = None) -> List[Move]:
+    """
+    Drops moves that are mirror images of an earlier move under a symmetry of the board.
+
+    On a symmetric board (e.g. the empty opening position) such moves lead to
+    equivalent positions, so only the first of each class needs searching.
+    With a key, a mirror image is only dropped if key gives it the same value
+    as the move it mirrors (e.g. how often its child position has occurred,
+    which the board's symmetry does not preserve).
+    """
+    symmetries = get_board_symmetries(board)
+    if len(symmetries) == 1:
+        return list(moves)
+    size = len(board)
+    seen = set()
+    unique: List[Move] = []
+    for move in moves:
+        value = key(move) if key is not None else None
+        if (move, value) in seen:
+            continue
+        unique.append(move)
+        seen.update((transform_move(move, t, size), value) for t in symmetries)
+    return unique
+
+def verify_canonical_forms(boards_per_size: int = 2000, seed: int = 0) -> None:
+    """
+    Asserts on random boards that canonicalize and canonicalize_masks pick the
+    same representative and transform, that the transform maps the board onto
+    it, and that every symmetric image of the board has the same representative.
+    """
+    rng = random.Random(seed)
+    for size in range(3, 6):
+        for _ in range(boards_per_size):
+            board: Board = [[rng.choice((None, 'X', 'O')) for _ in range(size)] for _ in range(size)]
+            canonical, transform = canonicalize(board)
+            masks, mask_transform = canonicalize_masks(*pack_board(board), size)
+            assert (pack_board(canonical), transform) == (masks, mask_transform)
+            assert canonical == transform_board(board, transform)
+            for t in range(NUM_TRANSFORMS):
+                assert canonicalize(transform_board(board, t))[0] == canonical
+
+
+if __name__ == "__main__":
+    verify_canonical_forms()
+    print("canonicalize and canonicalize_masks agree on random boards for sizes 3-5.")
@@ -0,0 +1,411 @@
+import json
+import mmap
+import multiprocessing
+import os
+import random
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from bitboard import BitboardTables, apply_move_masks, find_winner, get_tables, get_valid_moves_masks, pack_board
+from board_tables import Move
+
+Board = List[List[Optional[str]]]
+
+# One uint16 per position, from the point of view of the side to move:
+#   0 draw (or not resolved yet while building), WIN | d or LOSS | d where d
+#   is the number of plies until the game ends with best play.
+WIN = 0x4000
+LOSS = 0x8000
+DISTANCE_MASK = 0x3FFF
+
+# Positions handled per work unit; progress is saved after each one
+CHUNK_SIZE = 1 << 16
+TABLEBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+
+
+def table_path(size: int, directory: str = TABLEBASE_DIR) -> str:
+    return os.path.join(directory, f"tablebase_{size}x{size}.bin")
+
+
+def progress_path(size: int, directory: str = TABLEBASE_DIR) -> str:
+    return os.path.join(directory, f"tablebase_{size}x{size}.json")
+
+
+class PositionIndexer:
+    """
+    Maps positions to table indices and back.
+
+    Cell (r, c) is the base-3 digit r * size + c (0 empty, 1 X, 2 O), and the
+    side to move adds player_index * 3**(size * size). Both directions go one
+    row at a time through precomputed tables.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.row_mask = (1 << size) - 1
+        self.positions = 3 ** (size * size)
+        self.entries = 2 * self.positions
+        self.row_weights = tuple(3 ** (size * r) for r in range(size))
+        self.row_count = 3 ** size
+
+        # (x_row << size | o_row) -> base-3 value of the row
+        self.encode_row = [0] * (1 << (2 * size))
+        # base-3 value of the row -> (x_row, o_row)
+        self.decode_row: List[Tuple[int, int]] = [(0, 0)] * self.row_count
+        for value in range(self.row_count):
+            x_row = o_row = 0
+            digits = value
+            for c in range(size):
+                digits, digit = divmod(digits, 3)
+                if digit == 1:
+                    x_row |= 1 << c
+                elif digit == 2:
+                    o_row |= 1 << c
+            self.encode_row[x_row << size | o_row] = value
+            self.decode_row[value] = (x_row, o_row)
+
+    def index(self, x_mask: int, o_mask: int, player_index: int) -> int:
+        size, row_mask, encode_row = self.size, self.row_mask, self.encode_row
+        index = player_index * self.positions
+        for r, weight in enumerate(self.row_weights):
+            shift = r * size
+            index += encode_row[((x_mask >> shift) & row_mask) << size | ((o_mask >> shift) & row_mask)] * weight
+        return index
+
+    def position(self, index: int) -> Tuple[int, int, int]:
+        player_index, cells = divmod(index, self.positions)
+        x_mask = o_mask = 0
+        shift = 0
+        while cells:
+            cells, value = divmod(cells, self.row_count)
+            x_row, o_row = self.decode_row[value]
+            x_mask |= x_row << shift
+            o_mask |= o_row << shift
+            shift += self.size
+        return x_mask, o_mask, player_index
+
+
+@lru_cache(maxsize=None)
+def get_indexer(size: int) -> PositionIndexer:
+    return PositionIndexer(size)
+
+
+def _successors(x_mask: int, o_mask: int, player_index: int, tables: BitboardTables,
+                indexer: PositionIndexer) -> List[Tuple[Move, int]]:
+    return [(move, indexer.index(*apply_move_masks(x_mask, o_mask, move, player_index, tables), 1 - player_index))
+            for move in get_valid_moves_masks(x_mask, o_mask, player_index, tables)]
+
+
+def _solve_chunk(values: memoryview, size: int, pass_number: int, lo: int, hi: int) -> int:
+    """
+    Runs one retrograde pass over indices [lo, hi) and returns how many
+    positions in it are resolved at distance pass_number.
+
+    Pass 0 scores finished games (distance 0). Pass k resolves the positions
+    that win or lose in exactly k plies, looking only at successors resolved
+    by earlier passes, so entries written concurrently by the same pass (by
+    this or another process) never change the result. The count includes
+    entries this pass already wrote before an interrupted build was resumed,
+    so it is read from the table rather than from this run's writes.
+    """
+    tables = get_tables(size)
+    indexer = get_indexer(size)
+    resolved = 0
+    for index in range(lo, hi):
+        value = values[index]
+        if value:
+            if value & DISTANCE_MASK == pass_number:
+                resolved += 1
+            continue
+        x_mask, o_mask, player_index = indexer.position(index)
+        if pass_number == 0:
+            winner = find_winner(x_mask, o_mask, tables)
+            if winner is not None:
+                values[index] = WIN if winner == player_index else LOSS
+                resolved += 1
+            continue
+
+        successors = _successors(x_mask, o_mask, player_index, tables, indexer)
+        if not successors:
+            continue  # no legal move: scored as a draw, like MCTSNode.terminal
+        longest_loss = 0
+        all_lost = True
+        for _, successor in successors:
+            value = values[successor]
+            distance = value & DISTANCE_MASK
+            if value & LOSS and distance < pass_number:
+                values[index] = WIN | (distance + 1)
+                resolved += 1
+                break
+            if value & WIN and distance < pass_number:
+                longest_loss = max(longest_loss, distance)
+            else:
+                all_lost = False
+        else:
+            if all_lost:
+                values[index] = LOSS | (longest_loss + 1)
+                resolved += 1
+    return resolved
+
+
+# Per-process state of the build pool: the table mapped once per worker
+_worker_table: Optional[Tuple[mmap.mmap, memoryview]] = None
+
+
+def _open_table(path: str, writable: bool) -> Tuple[mmap.mmap, memoryview]:
+    with open(path, "r+b" if writable else "rb") as f:
+        table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+    return table, memoryview(table).cast('H')
+
+
+def _init_worker(path: str) -> None:
+    global _worker_table
+    _worker_table = _open_table(path, writable=True)
+
+
+def _close_worker() -> None:
+    global _worker_table
+    table, values = _worker_table
+    values.release()
+    table.close()
+    _worker_table = None
+
+
+def _run_chunk(job: Tuple[int, int, int, int]) -> Tuple[int, int]:
+    size, pass_number, chunk, entries = job
+    table, values = _worker_table
+    resolved = _solve_chunk(values, size, pass_number, chunk * CHUNK_SIZE, min(entries, (chunk + 1) * CHUNK_SIZE))
+    table.flush()
+    return chunk, resolved
+
+
+def _save_progress(path: str, progress: Dict) -> None:
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(progress, f)
+    os.replace(temp_path, path)
+
+
+def build_tablebase(size: int, directory: str = TABLEBASE_DIR, workers: int = 1, verbose: bool = True) -> None:
+    """
+    Solves every position of one board size into a memory-mapped table.
+
+    The table file (2 bytes per entry, 2 * 3**(size * size) entries) is
+    updated in place. After every chunk the finished chunks of the current
+    pass are recorded in a JSON progress file next to it, so an interrupted
+    build resumes where it stopped. With workers > 1 the chunks of each pass
+    are shared by a process pool; every process maps the same file.
+    """
+    indexer = get_indexer(size)
+    os.makedirs(directory, exist_ok=True)
+    path, state_path = table_path(size, directory), progress_path(size, directory)
+
+    progress = {"size": size, "pass": 0, "done_chunks": [], "resolved": 0, "complete": False}
+    if os.path.exists(state_path) and os.path.exists(path):
+        with open(state_path) as f:
+            progress = json.load(f)
+    else:
+        with open(path, "wb") as f:
+            f.truncate(2 * indexer.entries)
+    if progress["complete"]:
+        if verbose:
+            print(f"{size}x{size} tablebase is already complete: {path}")
+        return
+
+    chunks = (indexer.entries + CHUNK_SIZE - 1) // CHUNK_SIZE
+    pool = multiprocessing.Pool(workers, _init_worker, (path,)) if workers > 1 else None
+    if pool is None:
+        _init_worker(path)
+    try:
+        while True:
+            pass_number = progress["pass"]
+            start = time.monotonic()
+            done = set(progress["done_chunks"])
+            jobs = [(size, pass_number, chunk, indexer.entries) for chunk in range(chunks) if chunk not in done]
+            results = pool.imap_unordered(_run_chunk, jobs) if pool is not None else map(_run_chunk, jobs)
+            for chunk, resolved in results:
+                progress["done_chunks"].append(chunk)
+                progress["resolved"] += resolved
+                _save_progress(state_path, progress)
+
+            if verbose:
+                print(f"pass {pass_number}: {progress['resolved']} positions resolved "
+                      f"in {time.monotonic() - start:.1f}s")
+            # Every pass k > 0 resolves at least one position at distance k
+            # until the table is solved (pass 1 finds none only if there is
+            # nothing to solve at all)
+            finished = pass_number > 0 and progress["resolved"] == 0
+            progress = {"size": size, "pass": pass_number + 1, "done_chunks": [], "resolved": 0,
+                        "complete": finished}
+            _save_progress(state_path, progress)
+            if finished:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        else:
+            _close_worker()
+
+    if verbose:
+        tablebase = Tablebase(path, size)
+        result, distance = tablebase.probe(0, 0, 0)
+        print(f"{size}x{size} solved: the empty board is a {result} for X"
+              f"{f' in {distance} plies' if result != 'draw' else ''}")
+        print(tablebase.summary())
+        tablebase.close()
+
+
+class Tablebase:
+    """
+    Read-only view of a finished table; every probe is one lookup in the mapped file.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.size = size
+        self.tables = get_tables(size)
+        self.indexer = get_indexer(size)
+        self._table, self._values = _open_table(path, writable=False)
+        if len(self._values) != self.indexer.entries:
+            self.close()
+            raise ValueError(f"{path} does not hold a {size}x{size} tablebase.")
+
+    def close(self) -> None:
+        self._values.release()
+        self._table.close()
+
+    def probe(self, x_mask: int, o_mask: int, player_index: int) -> Tuple[str, int]:
+        """
+        Returns ("win" | "loss" | "draw", plies to the end) for the side to move.
+        """
+        value = self._values[self.indexer.index(x_mask, o_mask, player_index)]
+        if value & WIN:
+            return "win", value & DISTANCE_MASK
+        if value & LOSS:
+            return "loss", value & DISTANCE_MASK
+        return "draw", 0
+
+    def best_move(self, board: Board, player_symbol: str) -> Optional[Move]:
+        """
+        The perfect-play move: the fastest win, else a draw, else the slowest
+        loss; ties go to the first move in agent_utils order.
+        """
+        x_mask, o_mask = pack_board(board)
+        player_index = 0 if player_symbol == 'X' else 1
+        best, best_rank = None, None
+        for move, successor in _successors(x_mask, o_mask, player_index, self.tables, self.indexer):
+            value = self._values[successor]
+            distance = value & DISTANCE_MASK
+            # The successor's value is the opponent's
+            rank = (2, -distance) if value & LOSS else (0, distance) if value & WIN else (1, 0)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = move, rank
+        return best
+
+    def summary(self) -> str:
+        counts = {"win": 0, "loss": 0, "draw": 0}
+        longest = 0
+        for value in self._values:
+            if value & WIN:
+                counts["win"] += 1
+            elif value & LOSS:
+                counts["loss"] += 1
+            else:
+                counts["draw"] += 1
+            longest = max(longest, value & DISTANCE_MASK)
+        return (f"{counts['win']} wins, {counts['loss']} losses, {counts['draw']} draws for the side to move; "
+                f"longest forced result {longest} plies")
+
+
+@lru_cache(maxsize=None)
+def open_tablebase(size: int, directory: str = TABLEBASE_DIR) -> Optional[Tablebase]:
+    """
+    The finished tablebase for `size`, or None if it has not been built (completely).
+    """
+    path, state_path = table_path(size, directory), progress_path(size, directory)
+    if not os.path.exists(path) or not os.path.exists(state_path):
+        return None
+    with open(state_path) as f:
+        if not json.load(f).get("complete"):
+            return None
+    return Tablebase(path, size)
+
+
+def verify_tablebase(size: int, directory: str = TABLEBASE_DIR, samples: int = 20000, seed: int = 0) -> None:
+    """
+    Checks random entries against their successors: finished games match
+    find_winner, a win in d has a successor lost in d - 1 and none lost sooner,
+    a loss in d has only won successors, the longest in d - 1, and a draw has
+    neither.
+    """
+    tablebase = open_tablebase(size, directory)
+    if tablebase is None:
+        raise FileNotFoundError(f"No complete {size}x{size} tablebase in {directory}")
+    rng = random.Random(seed)
+    values, tables, indexer = tablebase._values, tablebase.tables, tablebase.indexer
+    for _ in range(samples):
+        index = rng.randrange(indexer.entries)
+        value = values[index]
+        distance = value & DISTANCE_MASK
+        x_mask, o_mask, player_index = indexer.position(index)
+        assert indexer.index(x_mask, o_mask, player_index) == index
+        winner = find_winner(x_mask, o_mask, tables)
+        if winner is not None:
+            assert value == (WIN if winner == player_index else LOSS), index
+            continue
+        successors = [values[successor] for _, successor in _successors(x_mask, o_mask, player_index, tables, indexer)]
+        lost = [s & DISTANCE_MASK for s in successors if s & LOSS]
+        won = [s & DISTANCE_MASK for s in successors if s & WIN]
+        if value & WIN:
+            assert lost and min(lost) == distance - 1, index
+        elif value & LOSS:
+            assert successors and len(won) == len(successors) and max(won) == distance - 1, index
+        else:
+            assert not lost and (not successors or len(won) < len(successors)), index
+
+
+def verify_resume(size: int = 3, interrupted_pass: int = 2) -> None:
+    """
+    Simulates a build killed after a chunk of interrupted_pass was flushed
+    but before its progress was saved, resumes it with build_tablebase and
+    asserts that the result is complete and identical to an uninterrupted build.
+    """
+    import tempfile
+
+    indexer = get_indexer(size)
+    chunks = (indexer.entries + CHUNK_SIZE - 1) // CHUNK_SIZE
+    with tempfile.TemporaryDirectory() as reference_dir, tempfile.TemporaryDirectory() as resumed_dir:
+        build_tablebase(size, reference_dir, verbose=False)
+
+        with open(table_path(size, resumed_dir), "wb") as f:
+            f.truncate(2 * indexer.entries)
+        table, values = _open_table(table_path(size, resumed_dir), writable=True)
+        for pass_number in range(interrupted_pass + 1):
+            # The interrupted pass only gets through its first chunk
+            for chunk in range(chunks if pass_number < interrupted_pass else 1):
+                _solve_chunk(values, size, pass_number, chunk * CHUNK_SIZE,
+                             min(indexer.entries, (chunk + 1) * CHUNK_SIZE))
+        values.release()
+        table.close()
+        _save_progress(progress_path(size, resumed_dir),
+                       {"size": size, "pass": interrupted_pass, "done_chunks": [], "resolved": 0,
+                        "complete": False})
+        build_tablebase(size, resumed_dir, verbose=False)
+
+        with open(progress_path(size, resumed_dir)) as f:
+            assert json.load(f)["complete"]
+        with open(table_path(size, reference_dir), "rb") as reference, \
+                open(table_path(size, resumed_dir), "rb") as resumed:
+            assert reference.read() == resumed.read()
+
+
+if __name__ == "__main__":
+    # python tablebase.py [size] [workers]
+    board_size = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    build_tablebase(board_size, workers=int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1)
+    verify_tablebase(board_size)
+    print(f"{board_size}x{board_size} tablebase entries are consistent with their successors.")
+    verify_resume()
+    print("A build resumed after an unsaved chunk matches an uninterrupted one.")
@@ -0,0 +1,74 @@
+import time
+from typing import List, Optional
+
+# How often (in seconds of search) the clock should be read once the node rate is known
+CHECK_PERIOD = 0.005
+MAX_CHECK_INTERVAL = 4096
+# Growth of iteration time per extra ply, assumed until two iterations have been timed
+DEFAULT_GROWTH = 4.0
+MIN_GROWTH = 1.5
+MAX_GROWTH = 10.0
+
+
+class TimeManager:
+    """
+    Tracks one move's thinking time on the monotonic clock.
+
+    The deadline is start_time + budget - reserve; the reserve covers whatever
+    the harness spends around the agent call (process start-up, pickling the
+    move back). Searches call expired(nodes) only every check_interval nodes:
+    each poll measures the node rate and sets the interval so the clock is read
+    about every CHECK_PERIOD seconds. Completed iterations are timed with
+    record_iteration so can_start_iteration can predict whether another ply
+    would still finish before the deadline.
+    """
+
+    def __init__(self, budget: float, reserve: float = 0.0, start_time: Optional[float] = None):
+        self.start_time = time.monotonic() if start_time is None else start_time
+        self.budget = budget
+        self.reserve = reserve
+        self.deadline = self.start_time + max(budget - reserve, 0.0)
+        self.check_interval = 1
+        self.polls = 0
+        self.iteration_times: List[float] = []
+        self._iteration_start = self.start_time
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start_time
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def expired(self, nodes: int) -> bool:
+        """
+        Reads the clock, re-tunes check_interval from the node rate and
+        returns True once the deadline has passed.
+        """
+        now = time.monotonic()
+        self.polls += 1
+        elapsed = now - self.start_time
+        if elapsed > 0:
+            self.check_interval = max(1, min(MAX_CHECK_INTERVAL, int(nodes / elapsed * CHECK_PERIOD)))
+        return now > self.deadline
+
+    def start_iteration(self) -> None:
+        self._iteration_start = time.monotonic()
+
+    def record_iteration(self) -> None:
+        self.iteration_times.append(time.monotonic() - self._iteration_start)
+
+    def predicted_iteration_time(self) -> float:
+        """
+        Estimated duration of the next iteration: the last one times the
+        growth between the last two (clamped), or DEFAULT_GROWTH before that.
+        """
+        if not self.iteration_times:
+            return 0.0
+        last = self.iteration_times[-1]
+        growth = DEFAULT_GROWTH
+        if len(self.iteration_times) >= 2 and self.iteration_times[-2] > 0:
+            growth = min(MAX_GROWTH, max(MIN_GROWTH, last / self.iteration_times[-2]))
+        return last * growth
+
+    def can_start_iteration(self) -> bool:
+        return self.predicted_iteration_time() <= self.remaining()
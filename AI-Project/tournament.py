@@ -0,0 +1,239 @@
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import statistics
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent_runner import AgentWorker, MoveResult, ponder_is_fair
+from game import XOShiftGame
+
+# Headless counterpart of main.py's agent-agent mode: same game rules, same
+# AgentWorker sandbox, no pygame. Neither main.py nor ui.py is imported (both
+# pull in pygame), so the defaults below mirror theirs.
+AGENT_TIME_LIMIT = 2.0
+MAX_TURNS = 250
+REPETITION_LIMIT: Optional[int] = 3
+REPLAYS_DIR = "replays"
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class AgentStats:
+    """
+    Results and move timings of one agent over a tournament.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        # Timings of answered moves only (valid or not); crashes and timeouts are just counted
+        self.elapsed: List[float] = []  # harness wall time per answered move
+        self.think_times: List[float] = []  # time inside agent_move per answered move
+        self.timeouts = 0
+        self.crashes = 0
+        self.invalid_moves = 0
+
+    def record_move(self, result: MoveResult) -> None:
+        if result.exception:
+            self.crashes += 1
+        elif result.timed_out:
+            self.timeouts += 1
+        else:
+            self.elapsed.append(result.elapsed)
+            self.think_times.append(result.think_time)
+
+    def summary(self) -> str:
+        line = f"{self.name}: {self.wins} W / {self.draws} D / {self.losses} L"
+        if self.elapsed:
+            line += (f" | {len(self.elapsed)} moves, think mean {statistics.mean(self.think_times) * 1000:.1f} ms, "
+                     f"median {statistics.median(self.think_times) * 1000:.1f} ms, "
+                     f"max {max(self.think_times) * 1000:.1f} ms, "
+                     f"harness overhead {(statistics.mean(self.elapsed) - statistics.mean(self.think_times)) * 1000:.1f} ms")
+        return line + f" | {self.timeouts} timeouts, {self.crashes} crashes, {self.invalid_moves} invalid moves"
+
+
+def _apply_agent_move(game: XOShiftGame, move: Any, player: str) -> bool:
+    # Anything that is not four board coordinates counts as an invalid move
+    try:
+        sr, sc, tr, tc = move
+        return game.apply_move(sr, sc, tr, tc, player)
+    except (TypeError, ValueError):
+        return False
+
+
+def play_game(game: XOShiftGame, agents: Dict[str, AgentWorker], stats: Dict[str, AgentStats],
+              max_turns: int = MAX_TURNS, repetition_limit: Optional[int] = REPETITION_LIMIT,
+              verbose: bool = False) -> Tuple[str, int, List[Dict[str, Any]]]:
+    """
+    Plays one game from game's current position with the turn rules of
+    main.py: a crash, timeout or invalid move passes the turn; the game is
+    drawn after max_turns turns or when a position occurs repetition_limit
+    times. Unlike main.py, where a human can always quit, every agent call
+    counts as a turn (crashes and invalid moves included), so a game against
+    an agent that always fails still ends after max_turns even without a
+    repetition limit. Returns (winner or "Draw", turns played, replay moves).
+    """
+    moves: List[Dict[str, Any]] = []
+    turn_count = 0
+    while not game.winner:
+        if turn_count >= max_turns:
+            game.winner = "Draw"
+            break
+        if repetition_limit and game.repetition_count() >= repetition_limit:
+            game.winner = "Draw"
+            break
+
+        player = game.current_player
+        agent, agent_stats = agents[player], stats[player]
+        try:
+            result = agent.request_move(game.board, player, game.position_counts)
+        except Exception as e:
+            result = MoveResult(exception=e)
+        agent_stats.record_move(result)
+        turn_count += 1
+
+        if result.exception:
+            if verbose:
+                print(f"Agent {player} crashed: {result.exception}. Opponent's turn.")
+            game.pass_turn()
+        elif result.timed_out:
+            if verbose:
+                print(f"Agent {player} timed out. Opponent's turn.")
+            game.pass_turn()
+        elif _apply_agent_move(game, result.move, player):
+            sr, sc, tr, tc = result.move
+            moves.append({"player": player, "src_r": sr, "src_c": sc, "tgt_r": tr, "tgt_c": tc})
+            if not game.winner:
+                game.pass_turn()
+                agent.ponder(game.board, player, game.position_counts)
+        else:
+            agent_stats.invalid_moves += 1
+            if verbose:
+                print(f"Agent {player} invalid move: {result.move}. Opponent's turn.")
+            game.pass_turn()
+    return game.winner, turn_count, moves
+
+
+def save_replay(directory: str, game: XOShiftGame, player_types: Dict[str, str],
+                moves: List[Dict[str, Any]], game_number: int) -> str:
+    """
+    Writes a replay in main.py's format, so the GUI's replay viewer can open it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Several headless games can end within the same second
+    filename = f"xo_{game.size}x{game.size}_A-A_{timestamp}_{game_number:03d}.json"
+    filepath = os.path.join(directory, filename)
+    metadata = {
+        "board_size": game.size,
+        "game_mode": "agent-agent",
+        "player_x_type": player_types['X'],
+        "player_o_type": player_types['O'],
+        "winner": game.winner
+    }
+    with open(filepath, "w") as f:
+        json.dump({"metadata": metadata, "moves": moves}, f, indent=4)
+    return filepath
+
+
+def run_tournament(agent_a_path: str, agent_b_path: str, games: int, size: int = 5,
+                   time_limit: float = AGENT_TIME_LIMIT, max_turns: int = MAX_TURNS,
+                   repetition_limit: Optional[int] = REPETITION_LIMIT, swap_colours: bool = True,
+                   ponder: bool = False, replays_dir: Optional[str] = None,
+                   verbose: bool = False) -> Tuple[AgentStats, AgentStats]:
+    """
+    Plays `games` games between two agent files and prints one line per game
+    and the totals. Agent A plays X in the first game; with swap_colours the
+    agents change sides every game. Each game gets fresh AgentWorkers, as in
+    main.py, so no agent state carries over from one game to the next.
+    """
+    if ponder and not ponder_is_fair():
+        print("Pondering disabled: not enough CPU cores for both agents to ponder fairly.")
+        ponder = False
+
+    stats_a = AgentStats(os.path.basename(agent_a_path).replace(".py", ""))
+    stats_b = AgentStats(os.path.basename(agent_b_path).replace(".py", ""))
+    if stats_a.name == stats_b.name:
+        stats_a.name, stats_b.name = stats_a.name + " (A)", stats_b.name + " (B)"
+    colour_wins = {'X': 0, 'O': 0, "Draw": 0}
+
+    for game_number in range(1, games + 1):
+        if swap_colours and game_number % 2 == 0:
+            paths = {'X': agent_b_path, 'O': agent_a_path}
+            stats = {'X': stats_b, 'O': stats_a}
+        else:
+            paths = {'X': agent_a_path, 'O': agent_b_path}
+            stats = {'X': stats_a, 'O': stats_b}
+
+        game = XOShiftGame(size=size)
+        agents = {player: AgentWorker(path, time_limit, ponder) for player, path in paths.items()}
+        try:
+            for agent in agents.values():
+                agent.start()
+            winner, turns, moves = play_game(game, agents, stats, max_turns, repetition_limit, verbose)
+        finally:
+            for agent in agents.values():
+                agent.close()
+
+        colour_wins[winner] += 1
+        if winner == "Draw":
+            stats['X'].draws += 1
+            stats['O'].draws += 1
+            outcome = "draw"
+        else:
+            loser = 'O' if winner == 'X' else 'X'
+            stats[winner].wins += 1
+            stats[loser].losses += 1
+            outcome = f"{winner} ({stats[winner].name}) wins"
+        line = f"Game {game_number}/{games}: X={stats['X'].name} O={stats['O'].name} -> {outcome} after {turns} turns"
+        if replays_dir is not None:
+            line += f", replay {save_replay(replays_dir, game, {p: s.name for p, s in stats.items()}, moves, game_number)}"
+        print(line)
+
+    print(f"\nResults after {games} games on {size}x{size} ({time_limit:.1f}s per move):")
+    print(stats_a.summary())
+    print(stats_b.summary())
+    print(f"By colour: X won {colour_wins['X']}, O won {colour_wins['O']}, {colour_wins['Draw']} draws")
+    return stats_a, stats_b
+
+
+def _agent_path(name: str) -> str:
+    # Bare agent names (your_agent, sample_agent.py) are looked up next to this file
+    if os.path.exists(name):
+        return name
+    if not name.endswith(".py"):
+        name += ".py"
+    return os.path.join(BASE_DIR, name)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Play XOShift games between two agents without the GUI.")
+    parser.add_argument("agent_a", help="agent file, or the name of an agent next to this script")
+    parser.add_argument("agent_b", help="agent file, or the name of an agent next to this script")
+    parser.add_argument("-n", "--games", type=int, default=10, help="number of games (default 10)")
+    parser.add_argument("-s", "--size", type=int, default=5, choices=(3, 4, 5), help="board size (default 5)")
+    parser.add_argument("-t", "--time-limit", type=float, default=AGENT_TIME_LIMIT,
+                        help=f"seconds per move (default {AGENT_TIME_LIMIT})")
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS,
+                        help=f"turns before a game is drawn (default {MAX_TURNS})")
+    parser.add_argument("--repetition-limit", type=int, default=REPETITION_LIMIT,
+                        help=f"occurrences of a position that draw the game, 0 to disable (default {REPETITION_LIMIT})")
+    parser.add_argument("--no-swap", action="store_true", help="agent A plays X in every game")
+    parser.add_argument("--ponder", action="store_true", help="let agents that support it ponder")
+    parser.add_argument("--replays", nargs="?", const=REPLAYS_DIR, default=None, metavar="DIR",
+                        help=f"save a replay of every game (to {REPLAYS_DIR}/ if no DIR is given)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print crashes, timeouts and invalid moves")
+    args = parser.parse_args(argv)
+
+    run_tournament(_agent_path(args.agent_a), _agent_path(args.agent_b), args.games, args.size,
+                   args.time_limit, args.max_turns, args.repetition_limit or None, not args.no_swap,
+                   args.ponder, args.replays, args.verbose)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
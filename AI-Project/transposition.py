@@ -0,0 +1,104 @@
+from typing import Dict, Optional, Tuple
+
+Move = Tuple[int, int, int, int]
+
+# Bound types stored with each score
+EXACT = 0
+LOWER_BOUND = 1  # search failed high: true score >= stored score
+UPPER_BOUND = 2  # search failed low: true score <= stored score
+
+REPLACE_DEPTH_PREFERRED = "depth"
+REPLACE_ALWAYS = "always"
+
+# Rough CPython cost of one occupied slot: the entry tuple, the 64-bit key,
+# the score and the list slot itself. Used to turn a memory budget into a size.
+ENTRY_BYTES_ESTIMATE = 200
+
+
+class TranspositionTable:
+    """
+    Fixed-size, directly indexed table of search results keyed by 64-bit position hashes.
+
+    Each slot holds (key, depth, bound, score, best_move, generation). The table
+    never grows: a new result either replaces the slot's entry or is dropped,
+    according to the replacement policy:
+      - "depth": keep the deeper entry, but always replace entries left over
+        from an earlier search (older generation) or for the same position.
+      - "always": the newest result always wins.
+    """
+
+    def __init__(self, max_entries: int = 1 << 18, replacement: str = REPLACE_DEPTH_PREFERRED):
+        if max_entries < 1:
+            raise ValueError("A transposition table needs at least one slot.")
+        if replacement not in (REPLACE_DEPTH_PREFERRED, REPLACE_ALWAYS):
+            raise ValueError(f"Unknown replacement policy '{replacement}'.")
+        self.max_entries = max_entries
+        self.replacement = replacement
+        self.generation = 0
+        self._slots: list = [None] * max_entries
+        self.reset_stats()
+
+    @classmethod
+    def from_megabytes(cls, megabytes: float, replacement: str = REPLACE_DEPTH_PREFERRED) -> "TranspositionTable":
+        return cls(max(1, int(megabytes * 1024 * 1024 / ENTRY_BYTES_ESTIMATE)), replacement)
+
+    def reset_stats(self) -> None:
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+        self.rejected = 0
+
+    def new_search(self) -> None:
+        """
+        Marks every existing entry as belonging to an earlier search, so the
+        depth-preferred policy lets fresh results replace it.
+        """
+        self.generation += 1
+
+    def clear(self) -> None:
+        self._slots = [None] * self.max_entries
+        self.reset_stats()
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, float, Optional[Move]]]:
+        """
+        Returns (depth, bound, score, best_move) for the position, or None.
+        """
+        self.probes += 1
+        entry = self._slots[key % self.max_entries]
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry[1], entry[2], entry[3], entry[4]
+
+    def store(self, key: int, depth: int, bound: int, score: float, best_move: Optional[Move]) -> None:
+        index = key % self.max_entries
+        entry = self._slots[index]
+        if entry is not None and self.replacement == REPLACE_DEPTH_PREFERRED:
+            if entry[0] != key and entry[5] == self.generation and entry[1] > depth:
+                self.rejected += 1
+                return
+        if entry is not None and entry[0] != key:
+            self.overwrites += 1
+        if best_move is None and entry is not None and entry[0] == key:
+            best_move = entry[4]  # keep the old move for ordering if this search found none
+        self._slots[index] = (key, depth, bound, score, best_move, self.generation)
+        self.stores += 1
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def occupancy(self) -> int:
+        return sum(1 for entry in self._slots if entry is not None)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "rejected": self.rejected,
+            "occupancy": self.occupancy() / self.max_entries,
+        }
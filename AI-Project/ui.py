@@ -45,6 +45,7 @@ class XOShiftUI:
         self.replay_finished = False
         self.selected_cell: Optional[Tuple[int, int]] = None
         self.record_replays_enabled = True
+        self.ponder_enabled = False  # main.py sets the default from its PONDER setting
         self.player_types: Dict[str, str] = {}
 
         self.header_height = 80
@@ -85,10 +86,18 @@ class XOShiftUI:
             "title": "XOShift Game",
             "record_replays_button": {
                 "text_on": "Record Replays: ON", "text_off": "Record Replays: OFF",
-                "rect": pygame.Rect(self.screen_width // 2 - (self.ITEM_WIDTH_NORMAL + 50) // 2, y_offset,
-                                    self.ITEM_WIDTH_NORMAL + 50, self.ITEM_HEIGHT),
+                "flag": "record_replays_enabled",
+                "rect": pygame.Rect(self.screen_width // 2 - self.ITEM_WIDTH_NORMAL - 35, y_offset,
+                                    self.ITEM_WIDTH_NORMAL + 20, self.ITEM_HEIGHT),
                 "action": "toggle_record_replays"
             },
+            "ponder_button": {
+                "text_on": "Pondering: ON", "text_off": "Pondering: OFF",
+                "flag": "ponder_enabled",
+                "rect": pygame.Rect(self.screen_width // 2 + 15, y_offset,
+                                    self.ITEM_WIDTH_NORMAL + 20, self.ITEM_HEIGHT),
+                "action": "toggle_ponder"
+            },
         }
         y_offset += spacing + group_spacing
 
@@ -230,6 +239,9 @@ class XOShiftUI:
             if button["rect"].collidepoint(mouse_pos):
                 self.record_replays_enabled = not self.record_replays_enabled
                 return None
+            if self.menu_options["ponder_button"]["rect"].collidepoint(mouse_pos):
+                self.ponder_enabled = not self.ponder_enabled
+                return None
             for button_info in self.menu_options["board_size_buttons"]:
                 if button_info["rect"].collidepoint(mouse_pos):
                     self.selected_board_size = button_info["value"]
@@ -249,7 +261,7 @@ class XOShiftUI:
                     self.state = self.STATE_REPLAY_FILE_SELECT
                     return None
                 return {"action": "start_game", "size": self.selected_board_size, "mode": self.selected_mode,
-                        "record_replay": self.record_replays_enabled}
+                        "record_replay": self.record_replays_enabled, "ponder": self.ponder_enabled}
             if self.menu_options["quit_button"]["rect"].collidepoint(mouse_pos):
                 return {"action": "quit"}
         return None
@@ -360,7 +372,7 @@ class XOShiftUI:
     def _draw_menu_button(self, button_info: Dict, is_selected: bool = False):
         text_to_display = ""
         if "text_on" in button_info and "text_off" in button_info:
-            text_to_display = button_info["text_on"] if self.record_replays_enabled else button_info["text_off"]
+            text_to_display = button_info["text_on"] if getattr(self, button_info["flag"]) else button_info["text_off"]
         elif "text" in button_info:
             text_to_display = button_info["text"]
         else:
@@ -381,6 +393,7 @@ class XOShiftUI:
         draw_text_centered(self.screen, self.menu_options["title"], self.title_font, self.MENU_TEXT_COLOR,
                            (self.screen_width // 2, 80))
         self._draw_menu_button(self.menu_options["record_replays_button"])
+        self._draw_menu_button(self.menu_options["ponder_button"])
         draw_text_centered(self.screen, self.menu_options["board_size_label"], self.large_font, self.MENU_TEXT_COLOR,
                            (self.screen_width // 2, self.menu_options["board_size_buttons_y_offset"]))
         for button in self.menu_options["board_size_buttons"]:
@@ -1,141 +1,150 @@
-from agent_utils import get_all_valid_moves
-import copy
+from agent_utils import get_distinct_moves, lookup_valid_moves, zobrist_hash
+from game import XOShiftGame
+from incremental_eval import build_line_table, get_line_codes
+from parallel_search import RootParallelSearch
+from repetition_store import RepetitionStore
+from search import NegamaxSearch, opponent_of, order_by_heuristics
+from symmetry import filter_symmetric_moves
+from tablebase import open_tablebase
+from transposition import TranspositionTable
 import time
-import random
-import os, json
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 # Configurable parameters
-MAX_DEPTH = 4
-TIME_LIMIT = 1.9
+MAX_DEPTH = 5
+# The harness passes its per-move limit as time_budget; this is used when it does not
+DEFAULT_TIME_BUDGET = 2.0
+TIME_RESERVE = 0.1  # seconds kept back for process start-up and returning the move
 DEPTH_DISCOUNT = 0.4
 BEAM_WIDTH = 4
+ASPIRATION_WINDOW = None  # e.g. 300 to search root moves in a window around their last score
 CHECK_BACK_CAPACITY = 8
+TT_MEGABYTES = 32
+TT_REPLACEMENT = "depth"  # "depth" (depth-preferred) or "always"
+REPORT_SEARCH_STATS = False
+# More than 1 splits the root moves over a pool of helper processes started on
+# the first move (see parallel_search); 1 keeps the deterministic serial search
+SEARCH_WORKERS = 1
+# Pondering (agent_ponder, used when the harness enables it) searches this much deeper
+PONDER_EXTRA_DEPTH = 2
+PONDER_TIME_LIMIT = 60.0  # upper bound for one pondering session
+# Positions seen this often are scored as draws (the harness's repetition rule)
+REPETITION_LIMIT = 3
+# Play from a solved table (python tablebase.py <size>) when one has been built for this size
+USE_TABLEBASE = True
 
 # Scoring parameters
 SCORE_2 = 10
 SCORE_3 = 100
 SCORE_4 = 1000
 WIN_SCORE = 10000
+# Score of a line holding 0..4+ of one player's pieces
+LINE_SCORES = (0, 0, SCORE_2, SCORE_3, SCORE_4)
+# Per board size, every base-3 line code -> (score for X, X owns it, O owns it)
+LINE_TABLES = {size: build_line_table(size, LINE_SCORES) for size in range(3, 6)}
 
 PAST_MOVES_FILE = "past_moves.json"
-
-class TimeoutException(Exception):
-    pass
-
-def apply_move(board: List[List[Optional[str]]], move: Tuple[int, int, int, int], player_symbol: str) -> None:
-    sr, sc, tr, tc = move
-    if sr == tr:  # Horizontal move
-        direction = 1 if tc > sc else -1
-        for col in range(sc, tc, direction):
-            board[sr][col] = board[sr][col + direction]
-    else:  # Vertical move
-        direction = 1 if tr > sr else -1
-        for row in range(sr, tr, direction):
-            board[row][sc] = board[row + direction][sc]
-    board[tr][tc] = player_symbol
-
-def check_winner(board: List[List[Optional[str]]], player_symbol: str) -> bool:
-    size = len(board)
-    for i in range(size):
-        if all(cell == player_symbol for cell in board[i]):
-            return True
-        if all(board[j][i] == player_symbol for j in range(size)):
-            return True
-    if all(board[i][i] == player_symbol for i in range(size)):
-        return True
-    if all(board[i][size-1-i] == player_symbol for i in range(size)):
-        return True
-    return False
-
-def evaluate_line(line, player, opponent, size):
-    p_count = line.count(player)
-    o_count = line.count(opponent)
-    if p_count == size: return WIN_SCORE
-    if o_count == size: return -WIN_SCORE
-    score = 0
-    if p_count >= 2 :
-        score += [0, 0, SCORE_2, SCORE_3, SCORE_4][min(p_count, 4)]
-    if o_count >= 2 :
-        score -= [0, 0, SCORE_2, SCORE_3, SCORE_4][min(o_count, 4)]
-    return score
+# The move history lives in memory for the whole game (the harness keeps the
+# agent's process alive); set to also save it to PAST_MOVES_FILE in the background
+PERSIST_PAST_MOVES = False
+
+# Ask the harness for its time budget and the game's position history (see agent_loader)
+ACCEPTS_TIME_BUDGET = True
+ACCEPTS_POSITION_HISTORY = True
+
+# Created on the first move and reused for as long as this process lives
+_search: Optional[NegamaxSearch] = None
+_parallel: Optional[RootParallelSearch] = None
+_past_moves: Optional[RepetitionStore] = None
+# (expected board, expected position history, best move, root candidates, completed depth)
+# from the last pondering session
+_ponder_result: Optional[Tuple[List[List[Optional[str]]], Optional[Dict[int, int]],
+                               Tuple[int, int, int, int], list, int]] = None
 
 def evaluate_board(board: List[List[Optional[str]]], player_symbol: str) -> int:
-    opponent = 'O' if player_symbol == 'X' else 'X'
     size = len(board)
-    score = 0
-    if check_winner(board, player_symbol): return WIN_SCORE
-    if check_winner(board, opponent): return -WIN_SCORE
-    for i in range(size):
-        score += evaluate_line(board[i], player_symbol, opponent, size)
-        score += evaluate_line([board[j][i] for j in range(size)], player_symbol, opponent, size)
-    score += evaluate_line([board[i][i] for i in range(size)], player_symbol, opponent, size)
-    score += evaluate_line([board[i][size-1-i] for i in range(size)], player_symbol, opponent, size)
-    return score
-
-def minimax(board, depth, is_max, player_symbol, alpha, beta, start_time, current_depth):
-    if time.time() - start_time > TIME_LIMIT:
-        raise TimeoutException()
-
-    opponent = 'O' if player_symbol == 'X' else 'X'
-    if depth == 0 or check_winner(board, player_symbol) or check_winner(board, opponent):
-        return evaluate_board(board, player_symbol) * (DEPTH_DISCOUNT ** current_depth)
-
-    moves = get_all_valid_moves(board, player_symbol if is_max else opponent)
-
-    # === Beam search part: score and keep top BEAM_WIDTH ===
-    scored_moves = []
-    for move in moves:
-        tmp_board = copy.deepcopy(board)
-        apply_move(tmp_board, move, player_symbol if is_max else opponent)
-        score = evaluate_board(tmp_board, player_symbol)
-        scored_moves.append((score, move))
-    # Sort moves: max wants high scores first, min wants low scores first
-    reverse = is_max
-    scored_moves.sort(reverse=reverse, key=lambda x: x[0])
-    # Keep only best BEAM_WIDTH moves
-    moves = [m for (_, m) in scored_moves[:BEAM_WIDTH]]
-
-    best_val = float('-inf') if is_max else float('inf')
-
-    for move in moves:
-        new_board = copy.deepcopy(board)
-        apply_move(new_board, move, player_symbol if is_max else opponent)
-        val = minimax(new_board, depth-1, not is_max, player_symbol, alpha, beta, start_time, current_depth+1)
-        if is_max:
-            best_val = max(best_val, val)
-            alpha = max(alpha, val)
-        else:
-            best_val = min(best_val, val)
-            beta = min(beta, val)
-        # ///////////////      p r u n n i n g    h a s    b e e n    r e m o v e d      ///////////////
-         # if beta <= alpha:
-        #     break
-        # ///////////////      p r u n n i n g    h a s    b e e n    r e m o v e d      ///////////////
-        if time.time() - start_time > TIME_LIMIT:
-            raise TimeoutException()
-
-    return best_val
-
+    table = LINE_TABLES[size]
+    line_codes = get_line_codes(size)
+    lines = [tuple(row) for row in board]
+    lines.extend(zip(*board))
+    lines.append(tuple(board[i][i] for i in range(size)))
+    lines.append(tuple(board[i][size-1-i] for i in range(size)))
+    score = x_lines = o_lines = 0
+    for line in lines:
+        line_score, x_complete, o_complete = table[line_codes[line]]
+        score += line_score
+        x_lines += x_complete
+        o_lines += o_complete
+    own_lines, opponent_lines = (x_lines, o_lines) if player_symbol == 'X' else (o_lines, x_lines)
+    if own_lines: return WIN_SCORE
+    if opponent_lines: return -WIN_SCORE
+    return score if player_symbol == 'X' else -score
 
 def board_to_hash(board):
     return ''.join([''.join(['_' if cell is None else cell for cell in row]) for row in board])
 
-def agent_move(board: List[List[Optional[str]]], player_symbol: str) -> Tuple[int, int, int, int]:
+def _root_moves(board: List[List[Optional[str]]], player_symbol: str,
+                position_history: Optional[Dict[int, int]]) -> List[Tuple[int, int, int, int]]:
+    """
+    The distinct moves to search at the root, minus mirror images on a symmetric board.
+
+    Mirror-image children have different position hashes, so with a game
+    history they are only merged when their children occurred equally often;
+    otherwise the one avoiding (or reaching) a repetition draw could be dropped.
+    """
+    moves = get_distinct_moves(board, player_symbol)
+    if not position_history:
+        return filter_symmetric_moves(board, moves)
+    game = XOShiftGame(len(board))
+    game.load_board(board, XOShiftGame.PLAYERS.index(player_symbol))
+
+    def child_count(move: Tuple[int, int, int, int]) -> int:
+        game.make_move(*move)
+        count = position_history.get(game.position_hash, 0)
+        game.unmake_move()
+        return count
+
+    return filter_symmetric_moves(board, moves, key=child_count)
+
+def make_search() -> NegamaxSearch:
+    """
+    The search this agent uses; also run by the helper processes of parallel mode.
+    """
+    # The table-based evaluate_board is as fast per node as incremental_eval's
+    # LineCodeEvaluator, which also charges a push/pop to every make/unmake
+    # (python incremental_eval.py compares them)
+    # Interior nodes are searched full width: killer/history ordering is cheap
+    # enough that the evaluation-sorted beam is no longer needed to reach MAX_DEPTH
+    return NegamaxSearch(evaluate_board, max_depth=MAX_DEPTH, depth_discount=DEPTH_DISCOUNT,
+                         root_beam_width=BEAM_WIDTH, order_moves=order_by_heuristics,
+                         aspiration_window=ASPIRATION_WINDOW, time_reserve=TIME_RESERVE,
+                         repetition_limit=REPETITION_LIMIT,
+                         transposition_table=TranspositionTable.from_megabytes(TT_MEGABYTES, TT_REPLACEMENT))
+
+def agent_move(board: List[List[Optional[str]]], player_symbol: str,
+               time_budget: float = DEFAULT_TIME_BUDGET,
+               position_history: Optional[Dict[int, int]] = None) -> Tuple[int, int, int, int]:
     # global past_moves
     # CHECK_BACK_CAPACITY = 5
 
-    start_time = time.time()
-    best_move: Tuple[int, int, int, int] = (0, 0, 0, 0)
-    best_score = float('-inf')
-    valid_moves = get_all_valid_moves(board, player_symbol)
+    start_time = time.monotonic()
+    valid_moves = _root_moves(board, player_symbol, position_history)
     size = len(board)
     if not valid_moves:
         return (0, 0, 0, 0)
     if len(valid_moves) == 1:
         return valid_moves[0]
-
-    global MAX_DEPTH, TIME_LIMIT
+    tablebase = open_tablebase(size) if USE_TABLEBASE else None
+    if tablebase is not None:
+        return tablebase.best_move(board, player_symbol)
+
+    global _search, _parallel
+    if _search is None:
+        _search = make_search()
+    if SEARCH_WORKERS > 1 and _parallel is None:
+        _parallel = RootParallelSearch(make_search, SEARCH_WORKERS, local_search=_search)
+    _search.max_depth = MAX_DEPTH
+    _search.transposition_table.reset_stats()
     # if size == 5:
     #     MAX_DEPTH = min(MAX_DEPTH, 3)
     #     TIME_LIMIT = 1.8
@@ -146,96 +155,95 @@ def agent_move(board: List[List[Optional[str]]], player_symbol: str) -> Tuple[in
     #     MAX_DEPTH = min(MAX_DEPTH, 5)
     #     TIME_LIMIT = 2.0
 
-    if size == 3:
-        WIN_SCORE = SCORE_3
-    elif size == 4:
-        WIN_SCORE = SCORE_4
-
-    try:
-        candidate_moves = valid_moves
-        # print("moves currentlly are as below befor running the functions:")
-        # for i in candidate_moves:
-        #     print("move: ", i)
-        # # candidate_moves_backup = candidate_moves
-        for depth in range(1, MAX_DEPTH + 1):
-            scored_moves = []
-            current_best_move = None
-            current_best_score = float('-inf')
-            for move in candidate_moves:
-                if time.time() - start_time > TIME_LIMIT:
-                    raise TimeoutException()
-                new_board = copy.deepcopy(board)
-                apply_move(new_board, move, player_symbol)
-                if depth == 1:
-                    score = evaluate_board(new_board, player_symbol)
-                else:
-                    score = minimax(new_board, depth-1, False, player_symbol,
-                                    float('-inf'), float('inf'), start_time, 1)
-                scored_moves.append((score, move))
-                if score > current_best_score:
-                    current_best_score = score
-                    current_best_move = move
-            if current_best_move is not None:
-                best_move = current_best_move
-                best_score = current_best_score
-            # Beam search: keep top BEAM_WIDTH moves
-            scored_moves.sort(reverse=True, key=lambda x: x[0])
-            candidate_moves = [m for (_, m) in scored_moves[:BEAM_WIDTH]]
-
-            # print("moves currentlly are as below:")
-            # for i in candidate_moves:
-            #     print("move: ", i)
-
-
-        # /////////////////////           m y   c o d e             ///////////////////////
-        try:
-            if os.path.exists(PAST_MOVES_FILE):
-                with open(PAST_MOVES_FILE, "r") as f:
-                    try:
-                        past_moves = json.load(f)
-                    except json.JSONDecodeError:
-                        past_moves = []
-            else:
-                past_moves = []
-                with open(PAST_MOVES_FILE, "w") as f:
-                    json.dump(past_moves, f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            past_moves = []
-        
-        board_hash = ''.join([''.join(['_' if c is None else c for c in row]) for row in board])
-        key = {"board": board_hash, "move": list(best_move)}
-        flag = False
-        
-        if key in past_moves:
-            
-            for i in candidate_moves:
-                
-                other_key = {"board": board_hash, "move": list(i)}
-                if other_key not in past_moves:
-                    past_moves.append(other_key)
-                    best_move = i
-                    flag = True
-                    break
-                
-            if not flag:
-                for i in candidate_moves:
-                    print("move: ", i)
-                best_move = random.choice(candidate_moves)
-                past_moves.append({"board": board_hash, "move": best_move})
-        else:
-            past_moves.append({"board": board_hash, "move": best_move})
-        
-        if len(past_moves) > CHECK_BACK_CAPACITY:
-            past_moves.pop(0)
-
-        with open(PAST_MOVES_FILE, "w") as f:
-            json.dump(past_moves, f, indent=4)
-        # /////////////////////           m y   c o d e             ///////////////////////
-            
-            
-            
-
-
-    except TimeoutException:
-        pass
+    global _ponder_result
+    # The history must match too: pondering scored repetitions against the one it expected
+    ponder_hit = (_ponder_result is not None and _ponder_result[0] == board
+                  and _ponder_result[1] == position_history
+                  and _ponder_result[4] >= MAX_DEPTH and _ponder_result[2] in valid_moves)
+    if ponder_hit:
+        # The opponent played the predicted reply and pondering already searched deep enough
+        _, _, best_move, candidate_moves, _ = _ponder_result
+        search_complete = True
+    else:
+        searcher = _parallel if _parallel is not None else _search
+        best_move = searcher.search(board, player_symbol, start_time, root_moves=valid_moves,
+                                    time_budget=time_budget, position_history=position_history)
+        candidate_moves = searcher.root_candidates
+        search_complete = not searcher.timed_out
+    _ponder_result = None
+
+    # The anti-repetition bookkeeping only runs when the search finished in time
+    if search_complete:
+        global _past_moves
+        if _past_moves is None:
+            _past_moves = RepetitionStore(CHECK_BACK_CAPACITY, PAST_MOVES_FILE if PERSIST_PAST_MOVES else None)
+        best_move = _past_moves.choose(zobrist_hash(board, player_symbol), best_move, candidate_moves)
+        # Written on a background thread, after the move has been chosen
+        _past_moves.save()
+
+    if REPORT_SEARCH_STATS and _parallel is not None and not ponder_hit:
+        print(f"Parallel {player_symbol}: {SEARCH_WORKERS} workers, {_parallel.nodes} nodes, "
+              f"depth {_parallel.completed_depth}")
+    elif REPORT_SEARCH_STATS:
+        stats = _search.transposition_table.stats()
+        print(f"TT {player_symbol}: {stats['probes']} probes, hit rate {stats['hit_rate']:.1%}, "
+              f"{stats['stores']} stores, {stats['overwrites']} overwrites, "
+              f"{stats['rejected']} rejected, occupancy {stats['occupancy']:.1%}")
+        print(f"Ordering {player_symbol}: {_search.nodes} nodes, {_search.cutoffs} cutoffs, "
+              f"{_search.first_move_cutoff_rate:.1%} on the first move, {_search.researches} re-searches, "
+              f"depth {_search.completed_depth}{' + partial' if _search.partial_iteration else ''}, "
+              f"{_search.timer.elapsed():.2f}s of {time_budget:.2f}s, clock read {_search.timer.polls} times"
+              f"{', ponder hit' if ponder_hit else ''}")
     return best_move if best_move else valid_moves[0]
+
+def agent_ponder(board: List[List[Optional[str]]], player_symbol: str, should_stop,
+                 position_history: Optional[Dict[int, int]] = None) -> None:
+    """
+    Thinks on the opponent's time (called by the harness between moves).
+
+    The opponent's reply is predicted from the principal variation of our last
+    search (or searched for if it is missing), then our answer to it is
+    searched PONDER_EXTRA_DEPTH plies deeper than usual until should_stop()
+    returns True. Either way the transposition table is warm for the next move.
+    Both searches see position_history (which already counts `board`), plus
+    the predicted position for the second, so repetitions are scored as in
+    agent_move; the result is only reused if the next history matches.
+    """
+    global _ponder_result
+    _ponder_result = None
+    if _search is None:
+        return
+    opponent = opponent_of(player_symbol)
+    _search.max_depth = MAX_DEPTH + PONDER_EXTRA_DEPTH
+
+    pv = _search.principal_variation
+    predicted = pv[1] if len(pv) > 1 else None
+    if predicted not in lookup_valid_moves(board, opponent):
+        opponent_moves = _root_moves(board, opponent, position_history)
+        if not opponent_moves:
+            return
+        predicted = _search.search(board, opponent, root_moves=opponent_moves,
+                                   time_budget=PONDER_TIME_LIMIT, stop=should_stop,
+                                   position_history=position_history)
+        if should_stop():
+            return
+
+    game = XOShiftGame(len(board))
+    game.load_board(board, XOShiftGame.PLAYERS.index(opponent))
+    if not game.apply_move(*predicted, opponent) or game.winner:
+        return
+    expected_board = game.board
+    expected_history = None
+    if position_history is not None:
+        # The harness will have recorded the predicted position once more by our next move
+        game.switch_player()
+        expected_history = dict(position_history)
+        expected_history[game.position_hash] = expected_history.get(game.position_hash, 0) + 1
+    valid_moves = _root_moves(expected_board, player_symbol, expected_history)
+    if not valid_moves:
+        return
+    best_move = _search.search(expected_board, player_symbol, root_moves=valid_moves,
+                               time_budget=PONDER_TIME_LIMIT, stop=should_stop,
+                               position_history=expected_history)
+    _ponder_result = (expected_board, expected_history, best_move, list(_search.root_candidates),
+                      _search.completed_depth)